@@ -0,0 +1,460 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# The apps import their modules by bare name, relative to their own directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(REPO_ROOT, 'predictor_model'), os.path.join(REPO_ROOT, 'visual_deployment')]
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import plotly.express as px  # noqa: E402
+
+import data_store  # noqa: E402
+import model_bundle  # noqa: E402
+from aggregates import DEMAND_COLUMNS, STATE_VIOLENCE_COLUMNS, AggregateCube  # noqa: E402
+from batch_predict import predict_frame  # noqa: E402
+from chart_render import chart_data, figure_json  # noqa: E402
+from event_index import RESPONSE_COLUMNS, EventIndex  # noqa: E402
+from preprocessing import scenario_to_row  # noqa: E402
+from query_engine import QueryEngine  # noqa: E402
+from trend_views import CHART_TYPES, TABS, tab_options, tab_query, trend_view  # noqa: E402
+from world_map import WorldMap, build_animated_figure, build_year_figure  # noqa: E402
+
+RESULTS_DIR = 'benchmarks/results'
+
+# Year ranges swept on every Regional/Country tab: the full range, halves, a decade,
+# the last five years and a single year
+YEAR_RANGES = [(1990, 2020), (1990, 2005), (2005, 2020), (2000, 2010), (2015, 2020), (2010, 2010)]
+
+# Countries benchmarked on the Country page (the ones with the most events)
+TOP_COUNTRIES = 5
+
+# Lengths of the synthetic dense series rendered by the render benchmark
+DENSE_POINTS = [1_000, 10_000, 100_000, 1_000_000]
+
+# Combined filter of the index benchmark (all flags must be set) and its year range
+INDEX_FILTER = ['demand_police_brutality', 'state_violence']
+INDEX_YEARS = (2000, 2015)
+
+# Scenario scored by the single-row prediction benchmark
+SCENARIO = {
+    'region': 'Africa', 'protest_duration': 3, 'participants_numeric': 5000, 'protesterviolence': 1,
+    'demand_political_behavior': 1,
+}
+
+# Relative slowdown reported as a regression by --against
+REGRESSION_THRESHOLD = 1.2
+
+
+def measure(func, repeat=5, number=1):
+    """
+    Runs `func` `number` times per repetition and returns per-call timings in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number * 1000)
+    return summarize(timings)
+
+
+def summarize(timings):
+    return {
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.fmean(timings),
+        'max_ms': max(timings),
+        'runs': len(timings),
+    }
+
+
+def scaled_source(source, scale, directory):
+    """
+    Writes the dataset repeated `scale` times to `directory` (synthetic scale-up; every
+    aggregate grows by the same factor) and returns its path.
+    """
+    if scale == 1:
+        return source
+    df = pd.read_csv(source)
+    path = os.path.join(directory, f'mass_mobilization_x{scale}.csv')
+    pd.concat([df] * scale, ignore_index=True).to_csv(path, index=False)
+    return path
+
+
+def bench_predictor(frame, artifact_dir, repeat):
+    results = {}
+
+    def cold_load():
+        model_bundle.clear_cache()
+        model_bundle.get_bundle(artifact_dir)
+
+    results['artifact_load_cold'] = measure(cold_load, repeat)
+    results['artifact_load_cached'] = measure(lambda: model_bundle.get_bundle(artifact_dir), repeat, 1000)
+
+    bundle = model_bundle.get_bundle(artifact_dir)
+    row = scenario_to_row(SCENARIO)
+    # Same calls as deployment.py's Predict button
+    results['single_prediction'] = measure(lambda: bundle.model.predict(bundle.encoder.encode_rows([row])), repeat, 100)
+    results['single_predict_proba'] = measure(lambda: bundle.model.predict_proba(bundle.encoder.encode_rows([row])), repeat, 100)
+
+    batch = frame.astype({'region': str, 'country': str})
+    results['batch_prediction'] = measure(lambda: predict_frame(batch, bundle), max(1, repeat // 2))
+    results['batch_prediction']['rows'] = len(batch)
+    return results
+
+
+def bench_data(source, store_dir, repeat):
+    results = {'csv_load': measure(lambda: pd.read_csv(source), repeat)}
+    results['store_build'] = measure(lambda: data_store.build_store(source, store_dir), max(1, repeat // 2))
+
+    def cold_store_load():
+        data_store.clear_cache()
+        data_store.get_frame(source, store_dir)
+
+    results['store_load'] = measure(cold_store_load, repeat)
+    frame = data_store.get_frame(source, store_dir)
+    results['cube_build'] = measure(lambda: AggregateCube.from_frame(frame), repeat)
+    return results, frame
+
+
+def tab_views(tab):
+    return [(tab, option) for option in (tab_options(tab) or [None])]
+
+
+def bench_tabs(cube, entities, year_ranges):
+    """
+    Sweeps every tab (each demand/violence option) of every entity across the year ranges.
+    The queries are timed against a cold and then a warm query cache; the full view
+    (query, chart and CSV download) is timed once per combination, alternating the chart
+    type. Timings are grouped per page and tab.
+    """
+    combinations = [
+        (entity_type, name, year_range, tab, option)
+        for entity_type, names in entities.items()
+        for name in names
+        for year_range in year_ranges
+        for tab in TABS
+        for _, option in tab_views(tab)
+    ]
+    timings = {}
+
+    def record(key, func):
+        start = time.perf_counter()
+        func()
+        timings.setdefault(key, []).append((time.perf_counter() - start) * 1000)
+
+    def tab_key(entity_type, tab, stage):
+        page = 'regional' if entity_type == 'region' else 'country'
+        return f'{page}.{tab.lower().replace(" ", "_")}.{stage}'
+
+    engine = QueryEngine(cube)
+    for stage in ['query_cold', 'query_warm']:
+        for entity_type, name, year_range, tab, option in combinations:
+            record(tab_key(entity_type, tab, stage),
+                   lambda: tab_query(engine, entity_type, name, year_range, tab, option))
+
+    engine = QueryEngine(cube)
+    for i, (entity_type, name, year_range, tab, option) in enumerate(combinations):
+        page = 'regional' if entity_type == 'region' else 'country'
+        chart_type = CHART_TYPES[i % len(CHART_TYPES)]
+        record(tab_key(entity_type, tab, 'view'),
+               lambda: trend_view(engine, entity_type, name, year_range, tab, chart_type, option, page))
+    return {key: summarize(values) for key, values in timings.items()}
+
+
+def bench_index(frame, entities, repeat):
+    """
+    Multi-filter queries (INDEX_FILTER within INDEX_YEARS) of the first region and
+    country: the event index against boolean masks over the whole frame, as the pages
+    filtered before the aggregate cube. 'crosstab' counts every demand x response pair.
+    """
+    results = {'build': measure(lambda: EventIndex(frame), max(1, repeat // 2))}
+    index = EventIndex(frame)
+    state_violence = frame[STATE_VIOLENCE_COLUMNS].to_numpy().sum(axis=1) > 0
+    flags = {column: frame[column].to_numpy() == 1 for column in DEMAND_COLUMNS + RESPONSE_COLUMNS}
+    flags['state_violence'] = state_violence
+    for entity_type, names in entities.items():
+        entity = names[0]
+
+        def scan_mask():
+            mask = ((frame[entity_type] == entity) & (frame['year'] >= INDEX_YEARS[0])
+                    & (frame['year'] <= INDEX_YEARS[1])).to_numpy()
+            for flag in INDEX_FILTER:
+                mask = mask & flags[flag]
+            return mask
+
+        def scan_crosstab():
+            mask = scan_mask()
+            return [[int((mask & flags[row] & flags[column]).sum()) for column in RESPONSE_COLUMNS]
+                    for row in DEMAND_COLUMNS]
+
+        results[f'{entity_type}.count_scan'] = measure(lambda: int(scan_mask().sum()), repeat)
+        results[f'{entity_type}.count_index'] = measure(
+            lambda: index.count(entity_type, entity, INDEX_YEARS, INDEX_FILTER), repeat, 100)
+        results[f'{entity_type}.yearly_index'] = measure(
+            lambda: index.yearly(entity_type, entity, INDEX_YEARS, INDEX_FILTER), repeat, 100)
+        results[f'{entity_type}.crosstab_scan'] = measure(scan_crosstab, repeat)
+        results[f'{entity_type}.crosstab_index'] = measure(
+            lambda: index.crosstab(entity_type, entity, INDEX_YEARS, DEMAND_COLUMNS, RESPONSE_COLUMNS, INDEX_FILTER),
+            repeat, 10)
+    return results
+
+
+def bench_render(cube, entities, repeat):
+    """
+    Figure payload (JSON bytes sent to the browser) and render time of every tab of the
+    first entity over the full year range: 'raw' charts the query result as is (untitled) and
+    serializes it on every rerun (the previous behaviour), 'cached' is a rerun served
+    from the view cache. Synthetic dense series show the payload staying flat with LTTB.
+    """
+    results = {}
+    year_range = YEAR_RANGES[0]
+    for entity_type, names in entities.items():
+        page = 'regional' if entity_type == 'region' else 'country'
+        for tab in TABS:
+            option = (tab_options(tab) or [None])[0]
+            name = f'{page}.{tab.lower().replace(" ", "_")}'
+            engine = QueryEngine(cube)
+            data = tab_query(engine, entity_type, names[0], year_range, tab, option)
+            y = data.columns[1]
+
+            def raw():
+                return figure_json(px.line(data, x='year', y=y))
+
+            def cached():
+                return figure_json(trend_view(engine, entity_type, names[0], year_range, tab, "Line Graph", option, page)['chart'])
+
+            results[f'{name}.raw'] = dict(measure(raw, repeat), payload_bytes=len(raw()))
+            results[f'{name}.cached'] = dict(measure(cached, repeat), payload_bytes=len(cached()))
+
+    rng = np.random.default_rng(0)
+    for points in DENSE_POINTS:
+        data = pd.DataFrame({'year': np.arange(points, dtype=np.int64),
+                             'value': rng.normal(size=points).cumsum()})
+
+        def raw():
+            return figure_json(px.line(data, x='year', y='value'))
+
+        def downsampled():
+            return figure_json(px.line(chart_data(data, 'year', 'value'), x='year', y='value'))
+
+        results[f'dense_{points}.raw'] = dict(measure(raw, max(1, repeat // 2)), payload_bytes=len(raw()))
+        results[f'dense_{points}.downsampled'] = dict(measure(downsampled, repeat), payload_bytes=len(downsampled()))
+    return results
+
+
+def bench_world(cube, repeat):
+    results = {'world_map_precompute': measure(lambda: WorldMap(cube), repeat)}
+    world_maps = WorldMap(cube)
+    years = world_maps.years
+
+    timings = []
+    for year in years:
+        start = time.perf_counter()
+        build_year_figure(world_maps.counts[year])
+        timings.append((time.perf_counter() - start) * 1000)
+    results['year_figure_build'] = summarize(timings)
+
+    for year in years[-world_maps.cache_size:]:
+        world_maps.year_figure(year)
+    results['year_figure_cached'] = measure(lambda: world_maps.year_figure(years[-1]), repeat, 1000)
+
+    # Serialization st.plotly_chart repeats on every rerun, cached figure or not
+    timings = []
+    for year in years[-world_maps.cache_size:]:
+        figure = world_maps.year_figure(year)
+        start = time.perf_counter()
+        figure_json(figure)
+        timings.append((time.perf_counter() - start) * 1000)
+    results['year_figure_json'] = summarize(timings)
+    results['animated_figure_build'] = measure(lambda: build_animated_figure(world_maps.all_counts), max(1, repeat // 2))
+    return results
+
+
+# Fresh-process startup of both inference paths: imports, model load and one prediction
+STARTUP_SCRIPTS = {
+    'interpreter': "pass",
+    'bundle': (
+        "from model_bundle import get_bundle\n"
+        "from preprocessing import scenario_to_row\n"
+        "model = get_bundle()\n"
+    ),
+    'compiled': (
+        "from compiled_model import get_compiled\n"
+        "from preprocessing import scenario_to_row\n"
+        "model = get_compiled()\n"
+    ),
+}
+
+
+def bench_startup(repeat):
+    """
+    Wall time of a new Python process that imports a model path, loads the model and
+    scores SCENARIO once, like a freshly started container (the compiled model must have
+    been exported with predictor_model/export_compiled.py).
+    """
+    predict = f"model.predict_proba(model.encoder.encode_rows([scenario_to_row({SCENARIO!r})]))\n"
+    env = dict(os.environ, PYTHONPATH=os.path.join(REPO_ROOT, 'predictor_model'), PYTHONWARNINGS='ignore')
+    results = {}
+    for name, script in STARTUP_SCRIPTS.items():
+        code = script if name == 'interpreter' else script + predict
+        results[name] = measure(lambda: subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, env=env,
+                                                       check=True), repeat)
+    return results
+
+
+def bench_apptest(repeat):
+    """
+    End-to-end script runs of both apps in Streamlit's headless AppTest (real dataset only).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    predictor = os.path.join(REPO_ROOT, 'predictor_model', 'deployment.py')
+    dashboard = os.path.join(REPO_ROOT, 'visual_deployment', 'mass_mobilization_app.py')
+
+    results['predictor_first_run'] = measure(lambda: AppTest.from_file(predictor, default_timeout=120).run(), repeat)
+    at = AppTest.from_file(predictor, default_timeout=120).run()
+    results['predictor_rerun'] = measure(at.run, repeat)
+
+    at = AppTest.from_file(dashboard, default_timeout=120).run()
+    for nav in ["Home", "World Trends", "Regional Trends", "Country Trends"]:
+        at.radio[0].set_value(nav).run()
+        results[f'dashboard_{nav.lower().replace(" ", "_")}_rerun'] = measure(at.run, repeat)
+    return results
+
+
+def run_scale(scale, args, workdir):
+    source = scaled_source(args.source, scale, workdir)
+    store_dir = os.path.join(workdir, f'store_x{scale}')
+    results = {}
+
+    data_results, frame = bench_data(source, store_dir, args.repeat)
+    results.update({f'data.{name}': stats for name, stats in data_results.items()})
+    results.update({f'predictor.{name}': stats for name, stats in
+                    bench_predictor(frame, args.artifact_dir, args.repeat).items()})
+
+    cube = AggregateCube.from_frame(frame)
+    countries = frame['country'].value_counts().index[:TOP_COUNTRIES]
+    entities = {'region': cube.entities('region'), 'country': [str(c) for c in countries]}
+    results.update({f'tabs.{name}': stats for name, stats in bench_tabs(cube, entities, YEAR_RANGES).items()})
+    results.update({f'index.{name}': stats for name, stats in bench_index(frame, entities, args.repeat).items()})
+    results.update({f'render.{name}': stats for name, stats in bench_render(cube, entities, args.repeat).items()})
+    results.update({f'world.{name}': stats for name, stats in bench_world(cube, args.repeat).items()})
+    return {'rows': len(frame), 'benchmarks': results}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(report):
+    medians = {
+        f'{scale} {name}': stats['median_ms']
+        for scale, scale_results in report['scales'].items()
+        for name, stats in scale_results['benchmarks'].items()
+    }
+    medians.update({f'apptest {name}': stats['median_ms'] for name, stats in report.get('apptest', {}).items()})
+    medians.update({f'startup {name}': stats['median_ms'] for name, stats in report.get('startup', {}).items()})
+    return medians
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """
+    Prints the median of every benchmark present in both result files and returns the
+    names that got slower by more than `threshold`.
+    """
+    old_medians = flatten(old)
+    regressions = []
+    print(f"{'benchmark':<52}{'old':>12}{'new':>12}{'ratio':>8}")
+    for name, after in flatten(new).items():
+        if name not in old_medians:
+            continue
+        before = old_medians[name]
+        ratio = after / before if before else float('inf')
+        flag = ' !' if ratio > threshold else ''
+        print(f"{name:<52}{before:>9.3f} ms{after:>9.3f} ms{ratio:>7.2f}x{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the predictor and dashboard hot paths without a browser.")
+    parser.add_argument('--scale', type=int, nargs='+', default=[1], help="synthetic row multipliers, e.g. 1 10 100")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--source', default=data_store.SOURCE_PATH)
+    parser.add_argument('--artifact-dir', default=model_bundle.ARTIFACT_DIR)
+    parser.add_argument('--apptest', action='store_true', help="also time full script runs with Streamlit's AppTest")
+    parser.add_argument('--startup', action='store_true', help="also time import + first prediction in a fresh process")
+    parser.add_argument('--output', help=f"results JSON (default: {RESULTS_DIR}/<commit>-<time>.json)")
+    parser.add_argument('--against', help="earlier results JSON to compare with")
+    args = parser.parse_args(argv)
+
+    # Paths are relative to the repository root, like in the apps
+    os.chdir(REPO_ROOT)
+    commit = git_commit()
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'scales': {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix='benchmarks-')
+    try:
+        for scale in args.scale:
+            start = time.perf_counter()
+            report['scales'][f'x{scale}'] = run_scale(scale, args, workdir)
+            print(f"x{scale}: {report['scales'][f'x{scale}']['rows']} rows in {time.perf_counter() - start:.1f}s",
+                  file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.apptest:
+        report['apptest'] = bench_apptest(args.repeat)
+    if args.startup:
+        report['startup'] = bench_startup(args.repeat)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'unknown'}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for scale, scale_results in report['scales'].items():
+        print(f"\n{scale} ({scale_results['rows']} rows)")
+        for name, stats in scale_results['benchmarks'].items():
+            payload = f"{stats['payload_bytes']:>12,} B" if 'payload_bytes' in stats else ''
+            print(f"  {name:<48}{stats['median_ms']:>10.3f} ms{payload}")
+    for name, stats in report.get('apptest', {}).items():
+        print(f"  apptest.{name:<40}{stats['median_ms']:>10.3f} ms")
+    for name, stats in report.get('startup', {}).items():
+        print(f"  startup.{name:<40}{stats['median_ms']:>10.3f} ms")
+    print(f"\nSaved {output}")
+
+    if args.against:
+        with open(args.against) as f:
+            regressions = compare(json.load(f), report)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {REGRESSION_THRESHOLD}x", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
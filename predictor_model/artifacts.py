@@ -0,0 +1,40 @@
+import hashlib
+import os
+
+# Default location of the saved artifacts (relative to the repository root, like the app itself)
+ARTIFACT_DIR = 'predictor_model'
+
+# File names of the artifacts that make up one model bundle
+ARTIFACT_FILES = {
+    'model': 'xgb_model.json',
+    'le_region': 'le_region.pkl',
+    'le_state_response': 'le_state_response.pkl',
+    'scaler': 'scaler.pkl',
+}
+
+
+def artifact_paths(artifact_dir=ARTIFACT_DIR):
+    return {name: os.path.join(artifact_dir, file) for name, file in ARTIFACT_FILES.items()}
+
+
+def file_signature(paths):
+    """
+    Cheap change detector: modification time and size of every artifact.
+    """
+    signature = []
+    for name in sorted(paths):
+        stat = os.stat(paths[name])
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def content_hash(paths):
+    """
+    Hashes the artifact contents; the first 12 hex digits are the model version.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(paths):
+        with open(paths[name], 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
@@ -0,0 +1,68 @@
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from model_bundle import ARTIFACT_DIR, get_bundle
+
+# Rows scored per booster call; keeps memory bounded for arbitrarily large files
+CHUNK_ROWS = 100_000
+
+
+def probability_column(label):
+    return 'proba_' + label.lower().replace(' ', '_')
+
+
+def predict_frame(df, bundle):
+    """
+    Scores a frame of protest scenarios (columns as in mass_mobilization_cleaned.csv).
+    Returns `df` with the predicted state response and one probability column per class appended.
+    """
+    probabilities = bundle.model.predict_proba(bundle.encoder.encode_frame(df))
+    classes = bundle.le_state_response.classes_
+
+    result = df.copy()
+    result['predicted_response'] = classes[probabilities.argmax(axis=1)]
+    for i, label in enumerate(classes):
+        result[probability_column(label)] = probabilities[:, i]
+    return result
+
+
+def predict_csv(source, bundle, chunk_rows=CHUNK_ROWS):
+    """
+    Reads `source` (a path or file-like object) in chunks of `chunk_rows` and yields one
+    scored frame per chunk, so only a single chunk is held in memory at a time.
+    """
+    for chunk in pd.read_csv(source, chunksize=chunk_rows):
+        yield predict_frame(chunk, bundle)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-score protest scenarios with the protest outcome model.")
+    parser.add_argument('input', help="CSV with the columns of mass_mobilization_cleaned.csv ('-' for stdin)")
+    parser.add_argument('output', nargs='?', default='-', help="where to write the predictions ('-' for stdout)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="rows scored per booster call")
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR, help="directory holding the model artifacts")
+    args = parser.parse_args(argv)
+
+    bundle = get_bundle(args.artifact_dir)
+    source = sys.stdin if args.input == '-' else args.input
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+
+    start = time.perf_counter()
+    rows = 0
+    try:
+        for i, scored in enumerate(predict_csv(source, bundle, args.chunk_rows)):
+            scored.to_csv(output, header=(i == 0), index=False)
+            rows += len(scored)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from model_bundle import ARTIFACT_DIR, get_bundle
+from preprocessing import FEATURE_COLUMNS, prepare_features
+
+# Dataset the scenarios are sampled from
+DATA_PATH = 'visual_deployment/mass_mobilization_cleaned.csv'
+
+
+def check_equal(bundle, df):
+    """
+    Asserts that the precompiled encoder reproduces the pandas/sklearn features bit for bit,
+    row by row and column-wise, and that the model returns identical probabilities for both.
+    """
+    reference = prepare_features(df, bundle).to_numpy(dtype=np.float32)
+    rows = df[FEATURE_COLUMNS].to_dict('records')
+
+    assert np.array_equal(bundle.encoder.encode_frame(df), reference)
+    assert np.array_equal(bundle.encoder.encode_rows(rows), reference)
+    for row, expected in zip(rows[:1000], reference):
+        assert np.array_equal(bundle.encoder.encode_row(row), expected)
+    assert np.array_equal(
+        bundle.model.predict_proba(bundle.encoder.encode_frame(df)),
+        bundle.model.predict_proba(prepare_features(df, bundle))
+    )
+
+
+def best_of(func, number, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the pandas/sklearn preprocessing with the precompiled FeatureEncoder.")
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR)
+    parser.add_argument('--data', default=DATA_PATH)
+    args = parser.parse_args(argv)
+
+    bundle = get_bundle(args.artifact_dir)
+    df = pd.read_csv(args.data)
+    check_equal(bundle, df)
+    print(f"Encoder output is bit-identical to prepare_features on {len(df)} rows")
+
+    row = df[FEATURE_COLUMNS].iloc[0].to_dict()
+    single_df = pd.DataFrame([row], columns=FEATURE_COLUMNS)
+    out = np.empty(len(FEATURE_COLUMNS), dtype=np.float32)
+    rows = df[FEATURE_COLUMNS].to_dict('records')
+
+    results = [
+        ('single row', best_of(lambda: prepare_features(single_df, bundle), 200),
+         best_of(lambda: bundle.encoder.encode_row(row, out), 20_000)),
+        (f'{len(rows)} row dicts', best_of(lambda: prepare_features(pd.DataFrame(rows, columns=FEATURE_COLUMNS), bundle), 5),
+         best_of(lambda: bundle.encoder.encode_rows(rows), 5)),
+        (f'{len(df)} row frame', best_of(lambda: prepare_features(df, bundle), 20),
+         best_of(lambda: bundle.encoder.encode_frame(df), 20)),
+    ]
+    print(f"{'case':<20}{'pandas/sklearn':>18}{'encoder':>14}{'speedup':>10}")
+    for case, before, after in results:
+        print(f"{case:<20}{before * 1e6:>15.1f} us{after * 1e6:>11.1f} us{before / after:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
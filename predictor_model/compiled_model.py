@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from artifacts import ARTIFACT_DIR, artifact_paths, content_hash, file_signature
+from preprocessing import CANADA_LABEL, FEATURE_COLUMNS, FeatureEncoder
+
+# The compiled model, written by export_compiled.py next to the artifacts it was built from
+COMPILED_FILE = 'compiled_model.npz'
+
+# Rows traversed at once; keeps the (rows x trees) node index matrix within the CPU caches
+CHUNK_ROWS = 512
+
+
+class CompiledModel:
+    """
+    numpy-only equivalent of a model bundle, loaded from the arrays export_compiled.py
+    writes: every tree of the booster flattened into one set of node arrays, plus the region
+    classes and scaler parameters of the FeatureEncoder and the state response labels.
+
+    A batch is traversed by stepping all (row, tree) node indices `depth` times: the next
+    node is the left child, plus one when the row goes right. A node sends a row left when
+    its feature value is below the threshold, or when it is missing and the node's default
+    direction is left, exactly like XGBoost. Leaves point to themselves and compare a
+    constant 0 column against +inf, so rows that already reached a leaf stay there.
+    """
+
+    def __init__(self, arrays, load_seconds=0.0):
+        self.left = arrays['left']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.default_left = arrays['default_left']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.depth = int(arrays['depth'])
+        self.base_margin = arrays['base_margin'].astype(np.float64)
+        self.classes = arrays['classes']
+        self.region_classes = arrays['region_classes']
+        self.version = str(arrays['version'])
+        self.load_seconds = load_seconds
+        self.encoder = FeatureEncoder(self.region_classes, arrays['mean'], arrays['scale'])
+        # Sums each tree's leaf value into the margin of the class it was grown for
+        self.tree_classes = np.zeros((len(self.roots), len(self.classes)))
+        self.tree_classes[np.arange(len(self.roots)), arrays['tree_class']] = 1.0
+
+    @classmethod
+    def load(cls, path):
+        start = time.perf_counter()
+        with np.load(path) as arrays:
+            arrays = {name: arrays[name] for name in arrays.files}
+        return cls(arrays, time.perf_counter() - start)
+
+    @property
+    def regions(self):
+        return [region if region != "Canada" else CANADA_LABEL for region in self.region_classes]
+
+    def leaf_values(self, X):
+        """
+        Leaf value reached by every row of the float32 feature matrix `X` in every tree,
+        shape (rows, trees).
+        """
+        n = len(X)
+        columns = len(FEATURE_COLUMNS) + 1
+        padded = np.zeros((n, columns), dtype=np.float32)
+        padded[:, :-1] = X
+        values = padded.ravel()
+        offsets = (np.arange(n, dtype=np.int64) * columns)[:, None]
+        nodes = np.broadcast_to(self.roots, (n, len(self.roots)))
+        for _ in range(self.depth):
+            x = values[offsets + self.feature[nodes]]
+            go_left = (x < self.threshold[nodes]) | (np.isnan(x) & self.default_left[nodes])
+            nodes = self.left[nodes] + ~go_left
+        return self.value[nodes]
+
+    def predict_margin(self, X):
+        X = np.asarray(X, dtype=np.float32).reshape(-1, len(FEATURE_COLUMNS))
+        margins = np.empty((len(X), len(self.classes)))
+        for start in range(0, len(X), CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            margins[start:start + len(chunk)] = self.leaf_values(chunk) @ self.tree_classes
+        return margins + self.base_margin
+
+    def predict_proba(self, X):
+        """
+        Class probabilities (softmax of the margins, as multi:softprob), in `classes` order.
+        """
+        margins = self.predict_margin(X)
+        margins -= margins.max(axis=1, keepdims=True)
+        probabilities = np.exp(margins)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities.astype(np.float32)
+
+    def predict(self, X):
+        """
+        Predicted state response labels.
+        """
+        return self.classes[self.predict_proba(X).argmax(axis=1)]
+
+
+# Process-wide cache: one compiled model per path, reloaded when it or the artifacts change
+_lock = threading.Lock()
+_models = {}
+
+
+def compiled_path(artifact_dir=ARTIFACT_DIR):
+    return os.path.join(artifact_dir, COMPILED_FILE)
+
+
+def _artifact_signature(paths):
+    # None when the artifacts are not deployed next to the compiled model
+    try:
+        return file_signature(paths)
+    except FileNotFoundError:
+        return None
+
+
+def get_compiled(artifact_dir=ARTIFACT_DIR):
+    """
+    Returns the cached compiled model of `artifact_dir`, loading it on first use or when
+    the modification time or size of the compiled model or of an artifact changed.
+
+    The compiled model is self-contained and can be deployed on its own. When the
+    artifacts it was exported from are next to it, it is a snapshot of them: after
+    retraining, rerun `python predictor_model/export_compiled.py`. A compiled model whose
+    version is not the content hash of those artifacts raises ValueError instead of
+    serving the previous model.
+    """
+    path = compiled_path(artifact_dir)
+    paths = artifact_paths(artifact_dir)
+    stat = os.stat(path)
+    artifacts = _artifact_signature(paths)
+    signature = ((stat.st_mtime_ns, stat.st_size), artifacts)
+    with _lock:
+        cached = _models.get(path)
+        if cached is None or cached[0] != signature:
+            model = CompiledModel.load(path)
+            version = None if artifacts is None else content_hash(paths)
+            if version is not None and model.version != version:
+                raise ValueError(f"{path} was exported from model {model.version} but the artifacts in "
+                                 f"{artifact_dir} are model {version}; rerun "
+                                 f"`python predictor_model/export_compiled.py --artifact-dir {artifact_dir}`")
+            cached = _models[path] = (signature, model)
+        return cached[1]
@@ -1,17 +1,25 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import xgboost as xgb
-import joblib
-
-# Load the saved model
-model = xgb.XGBClassifier()
-model.load_model('predictor_model/xgb_model.json')
-
-# Load the saved label encoders and fitted scaler
-le_region = joblib.load('predictor_model/le_region.pkl')
-le_state_response = joblib.load('predictor_model/le_state_response.pkl')
-scaler = joblib.load('predictor_model/scaler.pkl')
+from model_bundle import get_bundle, cache_stats
+from preprocessing import CANADA_LABEL, DEMANDS, scenario_to_row
+from batch_predict import predict_csv
+from what_if import get_engine, heatmap_figure
+from instrumentation import debug_enabled, finish_rerun, show_breakdown, stage, start_http_server, start_rerun
+
+# Stage timings of this run; exported on $METRICS_PORT (/metrics) and/or to $METRICS_FILE
+start_rerun('predictor')
+start_http_server()
+
+# Load the saved model, label encoders and fitted scaler.
+# The bundle is cached once per process and shared across sessions; it is only
+# reloaded when one of the artifact files changes on disk.
+with stage('load_bundle'):
+    bundle = get_bundle()
+model = bundle.model
+le_region = bundle.le_region
+le_state_response = bundle.le_state_response
+scaler = bundle.scaler
 
 # Title and Description
 st.title("Protest Outcome Prediction Model")
@@ -61,25 +69,24 @@ st.sidebar.write("""
     **Forceful Repression**: The government is likely to engage in use of excessive force, including beatings, shootings, or killings.
 """)
 
-# Define numerical and binary features
-numerical_features = ['protest_duration', 'participants_numeric']
+# Model bundle details
+stats = cache_stats()
+st.sidebar.caption(
+    f"Model version {bundle.version} · loaded in {bundle.load_seconds:.2f}s · "
+    f"cache hits {stats['hits']} / misses {stats['misses']}"
+)
+
+# Define binary features
 binary_features = ['protesterviolence']
 
 # Region input
-region = st.selectbox("Region", options=[x if x != "Canada" else "N.America (Canada)" for x in le_region.classes_])
+region = st.selectbox("Region", options=[x if x != "Canada" else CANADA_LABEL for x in le_region.classes_])
 
 # Write for demand checkboxes with smaller font size
 st.write("Select Primary Demands (You can choose more than one)")
 
 # Primary demand checkboxes
-demands = {
-    'demand_labor_wage_dispute': 'Labor/Wage Dispute',
-    'demand_land_farm_issue': 'Land/Farm Issue',
-    'demand_police_brutality': 'Police Brutality',
-    'demand_political_behavior': 'Political Behavior',
-    'demand_price_increases': 'Price Increases',
-    'demand_removal_of_politician': 'Removal of Politician'
-}
+demands = DEMANDS
 
 # Initialize demand columns with 0
 input_data = {key: 0 for key in demands.keys()}
@@ -95,32 +102,26 @@ participants_numeric = st.number_input("Number of Participants", min_value=1)
 # Protester violence input
 protesterviolence = st.selectbox("Protester Violence", options=["No", "Yes"])
 
-# Add region and numerical features to input_data
-input_data.update({
-    'region': region,
-    'protest_duration': protest_duration - 1,  # Adjusting for backend
-    'participants_numeric': participants_numeric,
-    'protesterviolence': 1 if protesterviolence == "Yes" else 0
-})
+# Add region and numerical features to input_data (the duration is adjusted for the backend)
+with stage('preprocess'):
+    input_data = scenario_to_row(dict(
+        input_data,
+        region=region,
+        protest_duration=protest_duration,
+        participants_numeric=participants_numeric,
+        protesterviolence=1 if protesterviolence == "Yes" else 0
+    ))
 
-# Convert input_data to DataFrame and ensure correct column order
-input_df = pd.DataFrame([input_data], columns=[
-    'region', 'protest_duration', 'participants_numeric', 'protesterviolence',
-    'demand_labor_wage_dispute', 'demand_land_farm_issue', 'demand_police_brutality',
-    'demand_political_behavior', 'demand_price_increases', 'demand_removal_of_politician'
-])
-
-# Preprocess inputs
-input_df['region'] = le_region.transform(input_df['region'].replace("N.America (Canada)", "Canada"))
-
-# Ensure the numerical features are properly handled
-input_df[numerical_features] = scaler.transform(input_df[numerical_features])
+    # Preprocess inputs (region encoding and scaling of the numerical features) into a
+    # single float32 row in model column order
+    input_df = bundle.encoder.encode_rows([input_data])
 
 # Button to predict state response
 if st.button('Predict Response'):
     # Make predictions
-    prediction = model.predict(input_df)
-    prediction_label = le_state_response.inverse_transform(prediction)[0]
+    with stage('predict'):
+        probabilities = model.predict_proba(input_df)[0]
+        prediction_label = le_state_response.inverse_transform([probabilities.argmax()])[0]
 
     # Mapping prediction to descriptive output
     response_mapping = {
@@ -132,3 +133,60 @@ if st.button('Predict Response'):
     # Display the prediction
     st.subheader("Predicted State Response")
     st.write(response_mapping[prediction_label])
+    st.table(pd.DataFrame({
+        'Response': le_state_response.classes_,
+        'Probability': [f"{p:.1%}" for p in probabilities],
+    }))
+
+# What-if analysis: the same demands and violence over every region, duration and crowd size
+st.header("What-if Analysis")
+if st.checkbox("Show how the predicted response changes with duration and participants"):
+    with stage('what_if'):
+        what_if = get_engine(bundle)
+        grid = what_if.sweep(input_data)
+    heatmap_region = st.selectbox("Heatmap Region", grid.regions, index=grid.regions.index(region))
+    heatmap_response = st.selectbox("Response", grid.classes, index=grid.classes.index('Forceful Repression'))
+    with stage('heatmap'):
+        st.plotly_chart(heatmap_figure(grid, heatmap_region, heatmap_response))
+    st.caption(f"{grid.size:,} scenarios scored in {grid.seconds * 1000:.0f} ms "
+               f"(what-if cache hits {what_if.hits} / misses {what_if.misses})")
+
+# Batch prediction
+st.header("Batch Prediction")
+st.write("""
+    Upload a CSV with the same columns as `mass_mobilization_cleaned.csv` to score many protest
+    scenarios at once. `protest_duration` is read as stored in the dataset (0 = same-day protest).
+""")
+uploaded_file = st.file_uploader("Protest scenarios (CSV)", type="csv")
+
+if uploaded_file is not None:
+    # Score each uploaded file only once per model version, not on every rerun
+    batch_key = (uploaded_file.file_id, bundle.version)
+    if st.session_state.get('batch_key') != batch_key:
+        with stage('batch_predict'):
+            st.session_state['batch_predictions'] = pd.concat(predict_csv(uploaded_file, bundle), ignore_index=True)
+        st.session_state['batch_csv'] = {}
+        st.session_state['batch_key'] = batch_key
+    batch_predictions = st.session_state['batch_predictions']
+    batch_csv = st.session_state['batch_csv']
+
+    def download_csv():
+        # Encoded when the button is first clicked and kept with the predictions
+        if 'data' not in batch_csv:
+            with stage('csv'):
+                batch_csv['data'] = batch_predictions.to_csv(index=False).encode('utf-8')
+        return batch_csv['data']
+
+    st.write(f"Scored {len(batch_predictions)} scenarios.")
+    st.dataframe(batch_predictions.head(100))
+    st.download_button(
+        label="Download Predictions",
+        data=download_csv,
+        file_name='protest_predictions.csv',
+        mime='text/csv',
+    )
+
+# Stage breakdown of this run in the sidebar (?debug=timings or $METRICS_DEBUG)
+breakdown = finish_rerun()
+if debug_enabled(st.query_params):
+    show_breakdown(st.sidebar, breakdown)
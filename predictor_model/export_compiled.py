@@ -0,0 +1,170 @@
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from compiled_model import CompiledModel, compiled_path
+from model_bundle import ARTIFACT_DIR, get_bundle
+from preprocessing import FEATURE_COLUMNS
+
+# Rows scored by the verification (the cleaned dataset, plus random and missing values)
+SOURCE_PATH = 'visual_deployment/mass_mobilization_cleaned.csv'
+RANDOM_ROWS = 20_000
+
+# Largest absolute difference from the booster's probabilities accepted by the export
+TOLERANCE = 1e-5
+
+
+def flatten_booster(booster):
+    """
+    Node arrays of every tree of a multi:softprob booster, concatenated in tree order with
+    child indices made global. XGBoost always allocates the two children of a split next to
+    each other, so only the left child is kept (the right one is left + 1). Leaves become
+    self-loops that hold their value and test a constant column appended to the features.
+    """
+    model = json.loads(booster.save_raw('json'))
+    learner = model['learner']
+    objective = learner['objective']['name']
+    if objective != 'multi:softprob':
+        raise ValueError(f"unsupported objective: {objective}")
+    trees = learner['gradient_booster']['model']['trees']
+    if any(tree['categories_nodes'] for tree in trees):
+        raise ValueError("categorical splits are not supported")
+
+    parts = {name: [] for name in ['left', 'feature', 'threshold', 'default_left', 'value']}
+    roots, depths, offset = [], [], 0
+    for tree in trees:
+        left = np.asarray(tree['left_children'], dtype=np.int32)
+        right = np.asarray(tree['right_children'], dtype=np.int32)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        nodes = np.arange(len(left), dtype=np.int32)
+        leaf = left == -1
+        if not (right[~leaf] == left[~leaf] + 1).all():
+            raise ValueError("unexpected node layout: right child is not next to the left child")
+        parts['left'].append(np.where(leaf, nodes, left) + offset)
+        parts['feature'].append(np.where(leaf, len(FEATURE_COLUMNS), tree['split_indices']).astype(np.int32))
+        parts['threshold'].append(np.where(leaf, np.float32(np.inf), conditions))
+        parts['default_left'].append(leaf | np.asarray(tree['default_left'], dtype=bool))
+        # A leaf stores its value in split_conditions
+        parts['value'].append(np.where(leaf, conditions, np.float32(0)))
+        roots.append(offset)
+        depths.append(_tree_depth(left, right))
+        offset += len(left)
+
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    base_score = learner['learner_model_param']['base_score']
+    arrays.update(
+        roots=np.asarray(roots, dtype=np.int32),
+        depth=np.int32(max(depths)),
+        tree_class=np.asarray(learner['gradient_booster']['model']['tree_info'], dtype=np.int32),
+        base_margin=np.asarray(json.loads(base_score) if base_score.startswith('[') else [float(base_score)],
+                               dtype=np.float32),
+    )
+    return arrays
+
+
+def _tree_depth(left, right):
+    depth, level = 0, [0]
+    while True:
+        level = [child for node in level if left[node] != -1 for child in (left[node], right[node])]
+        if not level:
+            return depth
+        depth += 1
+
+
+def verification_rows(bundle, source=SOURCE_PATH, random_rows=RANDOM_ROWS, seed=0):
+    """
+    Encoded rows of the cleaned dataset plus random rows spanning (and exceeding) the
+    feature ranges, with some missing values to exercise the default directions.
+    """
+    df = pd.read_csv(source, usecols=FEATURE_COLUMNS)
+    encoded = bundle.encoder.encode_frame(df)
+    rng = np.random.default_rng(seed)
+    random = np.empty((random_rows, len(FEATURE_COLUMNS)), dtype=np.float32)
+    random[:, 0] = rng.integers(0, len(bundle.le_region.classes_), random_rows)
+    random[:, 1:3] = rng.normal(0, 3, (random_rows, 2))
+    random[:, 3:] = rng.integers(0, 2, (random_rows, len(FEATURE_COLUMNS) - 3))
+    random[rng.random(random.shape) < 0.05] = np.nan
+    return np.concatenate([encoded, random])
+
+
+def verify(compiled, bundle, rows):
+    """
+    Largest absolute difference between the compiled and the booster probabilities, and
+    whether both predict the same class for every row.
+    """
+    expected = bundle.model.predict_proba(rows)
+    actual = compiled.predict_proba(rows)
+    return float(np.abs(expected - actual).max()), bool((expected.argmax(1) == actual.argmax(1)).all())
+
+
+def export(artifact_dir=ARTIFACT_DIR, output=None, source=SOURCE_PATH, tolerance=TOLERANCE):
+    """
+    Writes the compiled model of the bundle in `artifact_dir` (default: compiled_model.npz
+    next to the artifacts). The compiled model is verified against the booster on the rows
+    of verification_rows() before it atomically replaces `output`; if it differs by more
+    than `tolerance` or predicts another class, it is removed and ValueError is raised.
+    Returns the path, the bundle and the verification result.
+    """
+    bundle = get_bundle(artifact_dir)
+    arrays = flatten_booster(bundle.model.get_booster())
+    arrays.update(
+        classes=np.asarray(bundle.le_state_response.classes_, dtype=str),
+        region_classes=np.asarray(bundle.le_region.classes_, dtype=str),
+        mean=np.asarray(bundle.scaler.mean_, dtype=np.float64),
+        scale=np.asarray(bundle.scaler.scale_, dtype=np.float64),
+        version=np.asarray(bundle.version),
+    )
+    output = output or compiled_path(artifact_dir)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    tmp_path = f'{output}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(buffer.getvalue())
+
+    try:
+        compiled = CompiledModel.load(tmp_path)
+        rows = verification_rows(bundle, source)
+        start = time.perf_counter()
+        max_diff, same_class = verify(compiled, bundle, rows)
+        result = {'rows': len(rows), 'max_diff': max_diff, 'same_class': same_class,
+                  'seconds': time.perf_counter() - start}
+        if max_diff > tolerance or not same_class:
+            raise ValueError(f"compiled model differs from the booster (max abs diff {max_diff:.2e}, "
+                             f"tolerance {tolerance}, same predicted class: {same_class}); not written")
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, output)
+    return output, bundle, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the protest model to a numpy-only compiled model. Rerun after "
+                                     "retraining: the compiled model is refused once the artifacts change.")
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR, help="directory holding the model artifacts")
+    parser.add_argument('--output', help="compiled model path (default: <artifact-dir>/compiled_model.npz)")
+    parser.add_argument('--source', default=SOURCE_PATH, help="dataset scored by the verification")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    try:
+        output, _, result = export(args.artifact_dir, args.output, args.source, args.tolerance)
+    except ValueError as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    compiled = CompiledModel.load(output)
+    print(f"Exported model {compiled.version} to {output} ({os.path.getsize(output):,} bytes, "
+          f"{len(compiled.roots)} trees, {len(compiled.left):,} nodes, depth {compiled.depth})", file=sys.stderr)
+    print(f"Verified {result['rows']:,} rows in {result['seconds']:.2f}s: max abs diff {result['max_diff']:.2e}, "
+          f"same predicted class: {result['same_class']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from compiled_model import ARTIFACT_DIR, get_compiled
+from preprocessing import scenario_to_row
+
+# Largest number of rows scored in one booster call
+MAX_BATCH_ROWS = 512
+
+# How long a batch stays open for more requests once the first one arrived (seconds)
+MAX_BATCH_DELAY = 0.002
+
+# Number of most recent request latencies kept for the p50/p99 metrics
+LATENCY_WINDOW = 10_000
+
+
+def get_model(artifact_dir=ARTIFACT_DIR, compiled=False):
+    """
+    The cached model the service scores with: the numpy-only compiled model (written by
+    export_compiled.py) or the xgboost bundle. Both expose `encoder`, `version`, `classes`
+    and `predict_proba`. model_bundle is only imported for the bundle, so a compiled
+    service starts without loading xgboost or scikit-learn.
+    """
+    if compiled:
+        return get_compiled(artifact_dir)
+    from model_bundle import get_bundle
+    return get_bundle(artifact_dir)
+
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+
+
+class LatencyRecorder:
+    """
+    Request counters plus a sliding window of latencies for percentile reporting.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, seconds, ok=True):
+        self.requests += 1
+        if ok:
+            self.latencies.append(seconds)
+        else:
+            self.errors += 1
+
+    def snapshot(self):
+        snapshot = {'requests': self.requests, 'errors': self.errors, 'p50_ms': None, 'p99_ms': None}
+        if self.latencies:
+            p50, p99 = np.percentile(np.fromiter(self.latencies, dtype=float), [50, 99]) * 1000
+            snapshot.update(p50_ms=round(p50, 3), p99_ms=round(p99, 3))
+        return snapshot
+
+
+class MicroBatcher:
+    """
+    Merges the rows of concurrent requests into a single booster call.
+    Each of the `workers` batch loops takes whatever is queued (up to `max_batch_rows`),
+    waits `max_batch_delay` for stragglers and scores the batch on the thread pool, so up
+    to `workers` batches are scored at the same time.
+    """
+
+    def __init__(self, artifact_dir=ARTIFACT_DIR, workers=1, max_batch_rows=MAX_BATCH_ROWS,
+                 max_batch_delay=MAX_BATCH_DELAY, compiled=False):
+        self.artifact_dir = artifact_dir
+        self.compiled = compiled
+        self.workers = workers
+        self.max_batch_rows = max_batch_rows
+        self.max_batch_delay = max_batch_delay
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.queue = None
+        self.tasks = []
+        self.batches = 0
+        self.batched_rows = 0
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._batch_loop()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.executor.shutdown()
+
+    async def submit(self, rows):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((rows, future))
+        return await future
+
+    def _drain(self, pending, size):
+        while size < self.max_batch_rows and not self.queue.empty():
+            item = self.queue.get_nowait()
+            pending.append(item)
+            size += len(item[0])
+        return size
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            size = self._drain(pending, len(pending[0][0]))
+            if size < self.max_batch_rows and self.max_batch_delay > 0:
+                await asyncio.sleep(self.max_batch_delay)
+                size = self._drain(pending, size)
+
+            rows = [row for item_rows, _ in pending for row in item_rows]
+            try:
+                results = await loop.run_in_executor(self.executor, self._score, rows)
+            except Exception as exc:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self.batches += 1
+            self.batched_rows += len(rows)
+            offset = 0
+            for item_rows, future in pending:
+                if not future.done():
+                    future.set_result(results[offset:offset + len(item_rows)])
+                offset += len(item_rows)
+
+    def model(self):
+        return get_model(self.artifact_dir, self.compiled)
+
+    def _score(self, rows):
+        bundle = self.model()
+        features = bundle.encoder.encode_rows(rows)
+        probabilities = bundle.predict_proba(features)
+        classes = bundle.classes
+        return [
+            {
+                'predicted_response': classes[p.argmax()],
+                'probabilities': {label: float(value) for label, value in zip(classes, p)},
+                'model_version': bundle.version
+            }
+            for p in probabilities
+        ]
+
+
+class InferenceService:
+    """
+    Minimal HTTP/1.1 JSON server (keep-alive, Content-Length bodies) exposing:
+
+        POST /predict        one scenario object              -> one prediction
+        POST /predict/batch  {"instances": [scenario, ...]}   -> {"predictions": [...]}
+        GET  /metrics        latency percentiles and batching counters
+        GET  /health         model version
+
+    Scenarios use the app's units: `protest_duration` in days (minimum 1), region as
+    listed in the app (including "N.America (Canada)") and 0/1 demand flags.
+    """
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self.metrics = LatencyRecorder()
+
+    def _parse_rows(self, instances):
+        encoder = self.batcher.model().encoder
+        rows = []
+        for scenario in instances:
+            row = scenario_to_row(scenario)
+            encoder.region_code(row['region'])  # Reject unknown regions before batching
+            rows.append(row)
+        return rows
+
+    async def dispatch(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok', 'model_version': self.batcher.model().version}
+        if method == 'GET' and path == '/metrics':
+            metrics = self.metrics.snapshot()
+            metrics.update(
+                batches=self.batcher.batches,
+                mean_batch_rows=round(self.batcher.batched_rows / max(self.batcher.batches, 1), 2)
+            )
+            return 200, metrics
+        if method != 'POST' or path not in ('/predict', '/predict/batch'):
+            return 404, {'error': f"no route for {method} {path}"}
+
+        start = time.perf_counter()
+        try:
+            payload = json.loads(body)
+            if path == '/predict':
+                rows = self._parse_rows([payload])
+            else:
+                rows = self._parse_rows(payload['instances'] if isinstance(payload, dict) else payload)
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            self.metrics.record(time.perf_counter() - start, ok=False)
+            return 400, {'error': str(exc)}
+
+        try:
+            predictions = await self.batcher.submit(rows) if rows else []
+        except Exception as exc:
+            self.metrics.record(time.perf_counter() - start, ok=False)
+            return 500, {'error': str(exc)}
+
+        self.metrics.record(time.perf_counter() - start)
+        if path == '/predict':
+            return 200, predictions[0]
+        return 200, {'predictions': predictions}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self.dispatch(method, path.split('?', 1)[0], body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, batcher):
+    service = InferenceService(batcher)
+    batcher.start()
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Serving protest outcome predictions on http://{host}:{port} "
+          f"(model {batcher.model().version}, {batcher.workers} workers)", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON inference service for the protest outcome model.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="concurrent booster calls")
+    parser.add_argument('--max-batch-rows', type=int, default=MAX_BATCH_ROWS)
+    parser.add_argument('--max-batch-delay-ms', type=float, default=MAX_BATCH_DELAY * 1000)
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR, help="directory holding the model artifacts")
+    parser.add_argument('--compiled', action='store_true',
+                        help="score with the numpy-only compiled model instead of xgboost (rerun export_compiled.py "
+                             "after retraining; it is refused when it does not match the artifacts next to it)")
+    args = parser.parse_args(argv)
+
+    # Load the model before accepting connections; refuse to start on a stale compiled model
+    try:
+        get_model(args.artifact_dir, args.compiled)
+    except ValueError as e:
+        parser.error(str(e))
+    batcher = MicroBatcher(args.artifact_dir, args.workers, args.max_batch_rows, args.max_batch_delay_ms / 1000,
+                           args.compiled)
+    try:
+        asyncio.run(serve(args.host, args.port, batcher))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
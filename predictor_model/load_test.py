@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+# Scenario sent by every simulated client (app units: duration in days)
+SAMPLE_SCENARIO = {
+    'region': 'Africa',
+    'protest_duration': 3,
+    'participants_numeric': 5000,
+    'protesterviolence': 1,
+    'demand_police_brutality': 1,
+    'demand_political_behavior': 1
+}
+
+
+def build_request(host, path, payload):
+    body = json.dumps(payload).encode('utf-8')
+    head = (
+        f"POST {path} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    )
+    return head.encode('latin-1') + body
+
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, request, deadline, latencies, failures):
+    """
+    One keep-alive connection sending requests back to back until `deadline`.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, _ = await read_response(reader)
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures.append(status)
+    finally:
+        writer.close()
+
+
+async def fetch_metrics(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET /metrics HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    _, body = await read_response(reader)
+    writer.close()
+    return json.loads(body)
+
+
+async def run(host, port, concurrency, duration, batch_size):
+    if batch_size > 1:
+        request = build_request(host, '/predict/batch', {'instances': [SAMPLE_SCENARIO] * batch_size})
+    else:
+        request = build_request(host, '/predict', SAMPLE_SCENARIO)
+
+    latencies, failures = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(client(host, port, request, deadline, latencies, failures) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    print(f"{len(latencies)} requests in {elapsed:.2f}s with {concurrency} connections, {len(failures)} failed")
+    print(f"  requests/sec: {len(latencies) / elapsed:,.0f}")
+    print(f"  rows/sec:     {len(latencies) * batch_size / elapsed:,.0f}")
+    if len(ms):
+        print(f"  client latency p50 {np.percentile(ms, 50):.2f} ms, p99 {np.percentile(ms, 99):.2f} ms")
+    print(f"  server metrics: {await fetch_metrics(host, port)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for inference_service.py; reports requests/sec.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--concurrency', type=int, default=64, help="number of keep-alive connections")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds to run")
+    parser.add_argument('--batch-size', type=int, default=1, help="scenarios per request (>1 uses /predict/batch)")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.host, args.port, args.concurrency, args.duration, args.batch_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import joblib
+import xgboost as xgb
+
+from artifacts import ARTIFACT_DIR, ARTIFACT_FILES, artifact_paths, content_hash, file_signature  # noqa: F401
+from preprocessing import FeatureEncoder
+
+
+class ModelBundle:
+    """
+    The XGBoost booster together with the label encoders and scaler it was trained with.
+    `version` is a short content hash of the artifacts, so two bundles built from the same
+    files always share a version. `encoder` is the precompiled FeatureEncoder for the
+    bundle's region encoder and scaler.
+    """
+
+    def __init__(self, model, le_region, le_state_response, scaler, version, load_seconds):
+        self.model = model
+        self.le_region = le_region
+        self.le_state_response = le_state_response
+        self.scaler = scaler
+        self.version = version
+        self.load_seconds = load_seconds
+        self.encoder = FeatureEncoder.from_bundle(self)
+
+    @property
+    def classes(self):
+        return self.le_state_response.classes_
+
+    def predict_proba(self, features):
+        """
+        Class probabilities of encoded feature rows, in `classes` order (the same interface
+        as compiled_model.CompiledModel).
+        """
+        return self.model.predict_proba(features)
+
+
+# Process-wide cache: one bundle per artifact directory, shared by every session and rerun
+_lock = threading.Lock()
+_bundles = {}
+_signatures = {}
+_stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'last_load_seconds': 0.0}
+
+
+def _load_bundle(paths, version):
+    start = time.perf_counter()
+    model = xgb.XGBClassifier()
+    model.load_model(paths['model'])
+    le_region = joblib.load(paths['le_region'])
+    le_state_response = joblib.load(paths['le_state_response'])
+    scaler = joblib.load(paths['scaler'])
+    load_seconds = time.perf_counter() - start
+    return ModelBundle(model, le_region, le_state_response, scaler, version, load_seconds)
+
+
+def get_bundle(artifact_dir=ARTIFACT_DIR):
+    """
+    Returns the cached model bundle for `artifact_dir`, loading it on first use.
+    Every call stats the artifact files; when one of them changed on disk the contents are
+    re-hashed and the bundle is reloaded if the hash differs from the cached version.
+    """
+    paths = artifact_paths(artifact_dir)
+    signature = file_signature(paths)
+
+    with _lock:
+        bundle = _bundles.get(artifact_dir)
+        if bundle is not None and _signatures[artifact_dir] == signature:
+            _stats['hits'] += 1
+            return bundle
+
+        version = content_hash(paths)
+        if bundle is not None and bundle.version == version:
+            # Files were touched but their contents are unchanged
+            _signatures[artifact_dir] = signature
+            _stats['hits'] += 1
+            return bundle
+
+        _stats['misses'] += 1
+        if bundle is not None:
+            _stats['reloads'] += 1
+        bundle = _load_bundle(paths, version)
+        _stats['last_load_seconds'] = bundle.load_seconds
+        _bundles[artifact_dir] = bundle
+        _signatures[artifact_dir] = signature
+        return bundle
+
+
+def cache_stats():
+    """
+    Snapshot of the cache counters (hits, misses, reloads and the last load time in seconds).
+    """
+    with _lock:
+        return dict(_stats)
+
+
+def clear_cache():
+    with _lock:
+        _bundles.clear()
+        _signatures.clear()
@@ -0,0 +1,134 @@
+from operator import itemgetter
+
+import numpy as np
+
+# Region label shown in the app for protests in Canada (the encoder knows it as "Canada")
+CANADA_LABEL = "N.America (Canada)"
+
+# Friendly names of the primary demand columns
+DEMANDS = {
+    'demand_labor_wage_dispute': 'Labor/Wage Dispute',
+    'demand_land_farm_issue': 'Land/Farm Issue',
+    'demand_police_brutality': 'Police Brutality',
+    'demand_political_behavior': 'Political Behavior',
+    'demand_price_increases': 'Price Increases',
+    'demand_removal_of_politician': 'Removal of Politician'
+}
+
+# Numerical features handled by the fitted scaler
+NUMERICAL_FEATURES = ['protest_duration', 'participants_numeric']
+
+# Column order the model was trained with
+FEATURE_COLUMNS = [
+    'region', 'protest_duration', 'participants_numeric', 'protesterviolence',
+    'demand_labor_wage_dispute', 'demand_land_farm_issue', 'demand_police_brutality',
+    'demand_political_behavior', 'demand_price_increases', 'demand_removal_of_politician'
+]
+
+
+def scenario_to_row(scenario):
+    """
+    Converts a scenario as entered in the app into a model input row. `protest_duration` is
+    given in days (minimum 1, same-day protest) and adjusted for the backend; demand flags
+    that are not given default to 0.
+    """
+    if int(scenario['protest_duration']) < 1 or int(scenario['participants_numeric']) < 1:
+        raise ValueError("protest_duration and participants_numeric must be at least 1")
+    row = {key: int(scenario.get(key, 0)) for key in DEMANDS}
+    row.update({
+        'region': scenario['region'],
+        'protest_duration': int(scenario['protest_duration']) - 1,  # Adjusting for backend
+        'participants_numeric': int(scenario['participants_numeric']),
+        'protesterviolence': int(scenario.get('protesterviolence', 0))
+    })
+    return row
+
+
+def prepare_features(df, bundle):
+    """
+    Encodes the region and scales the numerical features of `df` with the bundle's fitted
+    encoder and scaler. Returns a new frame holding only the model columns, in model order.
+    `protest_duration` is expected in backend units (0 = same-day protest).
+    """
+    features = df[FEATURE_COLUMNS].copy()
+    features['region'] = bundle.le_region.transform(features['region'].replace(CANADA_LABEL, "Canada"))
+    features[NUMERICAL_FEATURES] = bundle.scaler.transform(features[NUMERICAL_FEATURES])
+    return features
+
+
+class FeatureEncoder:
+    """
+    Precompiled equivalent of prepare_features. The fitted region classes and scaler
+    parameters are turned into a lookup table and plain arithmetic that write straight into
+    a float32 row/matrix in model column order, without building a DataFrame or calling
+    sklearn. The scaling is done in float64 exactly like StandardScaler.transform before the
+    cast to float32, so the features are bit-identical to the pandas path.
+    """
+
+    def __init__(self, region_classes, mean, scale):
+        self.region_codes = {region: float(code) for code, region in enumerate(region_classes)}
+        if "Canada" in self.region_codes:
+            self.region_codes[CANADA_LABEL] = self.region_codes["Canada"]
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.duration_mean, self.participants_mean = (float(x) for x in self.mean)
+        self.duration_scale, self.participants_scale = (float(x) for x in self.scale)
+        self.numerical_values = itemgetter(*NUMERICAL_FEATURES)
+        self.flag_values = itemgetter(*FEATURE_COLUMNS[3:])
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        return cls(bundle.le_region.classes_, bundle.scaler.mean_, bundle.scaler.scale_)
+
+    def region_code(self, region):
+        try:
+            return self.region_codes[region]
+        except KeyError:
+            raise ValueError(f"unknown region: {region}") from None
+
+    def encode_row(self, row, out=None):
+        """
+        Encodes one row dict (as built by scenario_to_row) into `out`, a float32 array of
+        len(FEATURE_COLUMNS). A new array is allocated when `out` is not given.
+        """
+        if out is None:
+            out = np.empty(len(FEATURE_COLUMNS), dtype=np.float32)
+        out[0] = self.region_code(row['region'])
+        out[1] = (row['protest_duration'] - self.duration_mean) / self.duration_scale
+        out[2] = (row['participants_numeric'] - self.participants_mean) / self.participants_scale
+        out[3] = row['protesterviolence']
+        out[4] = row['demand_labor_wage_dispute']
+        out[5] = row['demand_land_farm_issue']
+        out[6] = row['demand_police_brutality']
+        out[7] = row['demand_political_behavior']
+        out[8] = row['demand_price_increases']
+        out[9] = row['demand_removal_of_politician']
+        return out
+
+    def encode_rows(self, rows, out=None):
+        """
+        Encodes a sequence of row dicts into a (len(rows), len(FEATURE_COLUMNS)) float32 matrix.
+        """
+        if out is None:
+            out = np.empty((len(rows), len(FEATURE_COLUMNS)), dtype=np.float32)
+        n = len(rows)
+        out[:, 0] = [self.region_code(row['region']) for row in rows]
+        numerical = np.array(list(map(self.numerical_values, rows)), dtype=np.float64).reshape(n, 2)
+        out[:, 1:3] = (numerical - self.mean) / self.scale
+        out[:, 3:] = np.array(list(map(self.flag_values, rows)), dtype=np.float32).reshape(n, len(FEATURE_COLUMNS) - 3)
+        return out
+
+    def encode_frame(self, df, out=None):
+        """
+        Column-wise encoding of a DataFrame holding FEATURE_COLUMNS (backend units).
+        """
+        if out is None:
+            out = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32)
+        codes = df['region'].map(self.region_codes)
+        if codes.isna().any():
+            self.region_code(df['region'][codes.isna()].iloc[0])
+        out[:, 0] = codes.to_numpy(dtype=np.float64)
+        numerical = df[NUMERICAL_FEATURES].to_numpy(dtype=np.float64)
+        out[:, 1:3] = (numerical - self.mean) / self.scale
+        out[:, 3:] = df[FEATURE_COLUMNS[3:]].to_numpy()
+        return out
@@ -0,0 +1,362 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.utils.class_weight import compute_sample_weight
+
+from export_compiled import export
+from model_bundle import ARTIFACT_FILES
+from preprocessing import FEATURE_COLUMNS, NUMERICAL_FEATURES, FeatureEncoder
+
+# Cleaned dataset produced by Data_Cleaning.ipynb (relative to the repository root, like the app)
+SOURCE_PATH = 'visual_deployment/mass_mobilization_cleaned.csv'
+
+# Preprocessed fold matrices and the results journal of every search
+CACHE_DIR = 'predictor_model/.search_cache'
+
+# Where the best model and its encoders/scaler are written (use predictor_model to deploy them)
+OUTPUT_DIR = 'predictor_model/search_output'
+
+RESPONSE_GROUPS = {
+    'Passive or Concessive': ['response_ignore', 'response_accomodation'],
+    'Control Measures': ['response_crowd_dispersal', 'response_arrests'],
+    'Forceful Repression': ['response_beatings', 'response_shootings', 'response_killings'],
+}
+
+# Search space of the notebook's RandomizedSearchCV, plus min_child_weight
+PARAM_SPACE = {
+    'max_depth': [3, 5, 6, 7, 9],
+    'learning_rate': [0.05, 0.1, 0.2, 0.3],
+    'subsample': [0.7, 0.8, 0.9, 1.0],
+    'colsample_bytree': [0.7, 0.85, 1.0],
+    'reg_lambda': [1, 2, 5],
+    'reg_alpha': [0, 0.1, 1],
+    'min_child_weight': [1, 3],
+}
+
+N_CANDIDATES = 20
+N_FOLDS = 5
+MAX_ROUNDS = 1000
+EARLY_STOPPING_ROUNDS = 30
+
+# Boosting rounds of the notebook's models (no early stopping)
+BASELINE_ROUNDS = 200
+
+
+def state_response(df):
+    """
+    Single target variable of the modelling notebook. Rows can have several responses;
+    like the notebook, Forceful Repression overrides Control Measures, which overrides
+    Passive or Concessive.
+    """
+    target = pd.Series(None, index=df.index, dtype=object)
+    for label, columns in RESPONSE_GROUPS.items():
+        target[(df[columns] == 1).any(axis=1)] = label
+    return target
+
+
+def load_training_data(source=SOURCE_PATH):
+    """
+    Reads the cleaned dataset and returns the model columns and the state response of
+    every protest with at least one recorded response.
+    """
+    df = pd.read_csv(source)
+    target = state_response(df)
+    keep = target.notna()
+    return df.loc[keep, FEATURE_COLUMNS].reset_index(drop=True), target[keep].reset_index(drop=True)
+
+
+def fit_preprocessing(X, y):
+    """
+    Fits the artifacts deployment.py loads: region and state response label encoders and
+    the scaler of the numerical features.
+    """
+    le_region = LabelEncoder().fit(X['region'])
+    le_state_response = LabelEncoder().fit(y)
+    scaler = StandardScaler().fit(X[NUMERICAL_FEATURES])
+    return le_region, le_state_response, scaler
+
+
+def _smote(X, y, seed):
+    try:
+        from imblearn.over_sampling import SMOTE
+    except ImportError:
+        raise SystemExit("--balance smote needs imbalanced-learn (pip install imbalanced-learn)") from None
+    return SMOTE(random_state=seed).fit_resample(X, y)
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _save_array(path, values):
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, values)
+    os.replace(path + '.tmp', path)
+
+
+def prepare_folds(source, cache_root=CACHE_DIR, n_folds=N_FOLDS, balance='weights', seed=42):
+    """
+    Encodes the dataset once and writes the stratified train/validation matrices of every
+    fold as .npy files, so candidates only memory-map them. Class balancing (sample weights
+    or SMOTE on the training part of each fold) is also done here, once per fold instead of
+    once per candidate. The cache directory is keyed by the source contents and the fold
+    settings; an existing complete cache is reused.
+    """
+    key = hashlib.sha256(json.dumps([_file_hash(source), n_folds, balance, seed]).encode()).hexdigest()[:12]
+    cache_dir = os.path.join(cache_root, key)
+    manifest_path = os.path.join(cache_dir, 'folds.json')
+    if os.path.exists(manifest_path):
+        return cache_dir
+
+    os.makedirs(cache_dir, exist_ok=True)
+    X, y = load_training_data(source)
+    le_region, le_state_response, scaler = fit_preprocessing(X, y)
+    encoded = FeatureEncoder(le_region.classes_, scaler.mean_, scaler.scale_).encode_frame(X)
+    labels = le_state_response.transform(y).astype(np.int32)
+
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for k, (train, valid) in enumerate(folds.split(encoded, labels)):
+        X_train, y_train = encoded[train], labels[train]
+        if balance == 'smote':
+            X_train, y_train = _smote(X_train, y_train, seed)
+        weights = compute_sample_weight('balanced', y_train) if balance == 'weights' else np.ones(len(y_train))
+        for name, values in [('X_train', X_train), ('y_train', y_train), ('w_train', weights.astype(np.float32)),
+                             ('X_valid', encoded[valid]), ('y_valid', labels[valid])]:
+            _save_array(os.path.join(cache_dir, f'fold{k}_{name}.npy'), np.ascontiguousarray(values))
+
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump({'source': os.path.abspath(source), 'folds': n_folds, 'balance': balance, 'seed': seed,
+                   'rows': len(labels), 'classes': list(le_state_response.classes_)}, f)
+    # Written last, so an interrupted preparation is redone
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return cache_dir
+
+
+# Per-worker fold matrices, loaded once by _init_worker and reused by every candidate
+_fold_data = []
+_num_class = 0
+
+
+def _init_worker(cache_dir):
+    global _fold_data, _num_class
+    with open(os.path.join(cache_dir, 'folds.json')) as f:
+        manifest = json.load(f)
+    _num_class = len(manifest['classes'])
+
+    def load(k, name):
+        return np.load(os.path.join(cache_dir, f'fold{k}_{name}.npy'), mmap_mode='r')
+
+    _fold_data = []
+    for k in range(manifest['folds']):
+        train = xgb.QuantileDMatrix(load(k, 'X_train'), label=load(k, 'y_train'), weight=load(k, 'w_train'))
+        valid = xgb.QuantileDMatrix(load(k, 'X_valid'), label=load(k, 'y_valid'), ref=train)
+        _fold_data.append((train, valid, np.asarray(load(k, 'y_valid'))))
+
+
+def booster_params(params, nthread=1):
+    return {
+        'objective': 'multi:softprob',
+        'num_class': _num_class,
+        'eval_metric': 'mlogloss',
+        'tree_method': 'hist',
+        'nthread': nthread,
+        'eta': params['learning_rate'],
+        'max_depth': params['max_depth'],
+        'subsample': params['subsample'],
+        'colsample_bytree': params['colsample_bytree'],
+        'lambda': params['reg_lambda'],
+        'alpha': params['reg_alpha'],
+        'min_child_weight': params['min_child_weight'],
+        'seed': 42,
+    }
+
+
+def evaluate_candidate(params, max_rounds=MAX_ROUNDS, early_stopping_rounds=EARLY_STOPPING_ROUNDS):
+    """
+    Cross-validates one candidate on the cached folds (single-threaded; candidates run in parallel).
+    """
+    start = time.perf_counter()
+    losses, accuracies, rounds = [], [], []
+    for train, valid, y_valid in _fold_data:
+        booster = xgb.train(booster_params(params), train, num_boost_round=max_rounds,
+                            evals=[(valid, 'valid')], early_stopping_rounds=early_stopping_rounds,
+                            verbose_eval=False)
+        best_rounds = booster.best_iteration + 1
+        proba = booster.predict(valid, iteration_range=(0, best_rounds))
+        losses.append(booster.best_score)
+        accuracies.append(float((proba.argmax(axis=1) == y_valid).mean()))
+        rounds.append(best_rounds)
+    return {
+        'params': params,
+        'mlogloss': float(np.mean(losses)),
+        'accuracy': float(np.mean(accuracies)),
+        'rounds': int(round(np.mean(rounds))),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def candidate_key(params, max_rounds, early_stopping_rounds):
+    return json.dumps([params, max_rounds, early_stopping_rounds], sort_keys=True)
+
+
+def read_journal(path):
+    results = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Line cut short by an interrupted run
+                results[entry['key']] = entry['result']
+    return results
+
+
+def run_search(cache_dir, candidates, workers=None, max_rounds=MAX_ROUNDS,
+               early_stopping_rounds=EARLY_STOPPING_ROUNDS, log=sys.stderr):
+    """
+    Evaluates `candidates` across a process pool. Every finished candidate is appended to
+    the cache's results journal, so an interrupted search resumes where it stopped.
+    Returns all results sorted by validation log loss.
+    """
+    journal_path = os.path.join(cache_dir, 'results.jsonl')
+    done = read_journal(journal_path)
+    pending = [params for params in candidates
+               if candidate_key(params, max_rounds, early_stopping_rounds) not in done]
+    if len(pending) < len(candidates):
+        print(f"Resuming: {len(candidates) - len(pending)} of {len(candidates)} candidates already evaluated", file=log)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_init_worker,
+                                 initargs=(cache_dir,)) as pool, open(journal_path, 'a') as journal:
+            futures = [pool.submit(evaluate_candidate, params, max_rounds, early_stopping_rounds) for params in pending]
+            for i, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                key = candidate_key(result['params'], max_rounds, early_stopping_rounds)
+                done[key] = result
+                journal.write(json.dumps({'key': key, 'result': result}) + '\n')
+                journal.flush()
+                print(f"[{i}/{len(pending)}] mlogloss {result['mlogloss']:.4f} accuracy {result['accuracy']:.4f} "
+                      f"rounds {result['rounds']} ({result['seconds']:.1f}s) {result['params']}", file=log)
+
+    keys = {candidate_key(params, max_rounds, early_stopping_rounds) for params in candidates}
+    return sorted((done[key] for key in keys), key=lambda result: result['mlogloss'])
+
+
+def fit_final(source, best, output_dir=OUTPUT_DIR, balance='weights', seed=42, nthread=None):
+    """
+    Refits the best candidate on the full dataset and writes xgb_model.json, le_region.pkl,
+    le_state_response.pkl and scaler.pkl in the format deployment.py loads, plus the
+    matching compiled_model.npz (verified against the booster, see export_compiled.export).
+    """
+    X, y = load_training_data(source)
+    le_region, le_state_response, scaler = fit_preprocessing(X, y)
+    encoded = FeatureEncoder(le_region.classes_, scaler.mean_, scaler.scale_).encode_frame(X)
+    labels = le_state_response.transform(y)
+    weights = None
+    if balance == 'smote':
+        encoded, labels = _smote(encoded, labels, seed)
+    elif balance == 'weights':
+        weights = compute_sample_weight('balanced', labels)
+
+    model = xgb.XGBClassifier(**best['params'], n_estimators=best['rounds'], tree_method='hist',
+                              random_state=seed, n_jobs=nthread)
+    model.fit(pd.DataFrame(encoded, columns=FEATURE_COLUMNS), labels, sample_weight=weights)
+
+    os.makedirs(output_dir, exist_ok=True)
+    model.save_model(os.path.join(output_dir, ARTIFACT_FILES['model']))
+    joblib.dump(le_region, os.path.join(output_dir, ARTIFACT_FILES['le_region']))
+    joblib.dump(le_state_response, os.path.join(output_dir, ARTIFACT_FILES['le_state_response']))
+    joblib.dump(scaler, os.path.join(output_dir, ARTIFACT_FILES['scaler']))
+    _, bundle, _ = export(output_dir, source=source)
+    return bundle
+
+
+def run_baseline(source, candidates, workers=None, n_folds=N_FOLDS, balance='weights', seed=42):
+    """
+    The notebook's approach: a scikit-learn search over an XGBClassifier pipeline that redoes
+    preprocessing (and SMOTE) for every candidate and fold, with a fixed number of rounds
+    and the exact tree method. Used to time the harness against.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.model_selection import GridSearchCV
+    from sklearn.pipeline import Pipeline
+
+    X, y = load_training_data(source)
+    X = X.assign(region=LabelEncoder().fit_transform(X['region']))
+    labels = LabelEncoder().fit_transform(y)
+    steps = [('scale', ColumnTransformer([('scaler', StandardScaler(), NUMERICAL_FEATURES)], remainder='passthrough'))]
+    if balance == 'smote':
+        from imblearn.over_sampling import SMOTE
+        from imblearn.pipeline import Pipeline
+        steps.append(('smote', SMOTE(random_state=seed)))
+    steps.append(('xgb', xgb.XGBClassifier(n_estimators=BASELINE_ROUNDS, tree_method='exact', n_jobs=1, random_state=seed)))
+
+    grid = [{f'xgb__{name}': [value] for name, value in params.items()} for params in candidates]
+    search = GridSearchCV(Pipeline(steps), grid, scoring='neg_log_loss', n_jobs=workers or -1,
+                          cv=StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed))
+    fit_params = {'xgb__sample_weight': compute_sample_weight('balanced', labels)} if balance == 'weights' else {}
+    search.fit(X, labels, **fit_params)
+    return search
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search for the protest outcome model.")
+    parser.add_argument('--source', default=SOURCE_PATH, help="cleaned dataset CSV")
+    parser.add_argument('--candidates', type=int, default=N_CANDIDATES, help="number of sampled candidates")
+    parser.add_argument('--folds', type=int, default=N_FOLDS)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--max-rounds', type=int, default=MAX_ROUNDS)
+    parser.add_argument('--early-stopping-rounds', type=int, default=EARLY_STOPPING_ROUNDS)
+    parser.add_argument('--balance', choices=['weights', 'smote', 'none'], default='weights',
+                        help="class balancing of the training folds (smote needs imbalanced-learn)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help="where to write the best model artifacts")
+    parser.add_argument('--baseline', action='store_true', help="also time the notebook-style search on the same candidates")
+    args = parser.parse_args(argv)
+
+    candidates = [
+        {name: (value.item() if isinstance(value, np.generic) else value) for name, value in params.items()}
+        for params in ParameterSampler(PARAM_SPACE, n_iter=args.candidates, random_state=args.seed)
+    ]
+
+    start = time.perf_counter()
+    cache_dir = prepare_folds(args.source, args.cache_dir, args.folds, args.balance, args.seed)
+    prepare_seconds = time.perf_counter() - start
+    results = run_search(cache_dir, candidates, args.workers, args.max_rounds, args.early_stopping_rounds)
+    search_seconds = time.perf_counter() - start
+
+    best = results[0]
+    print(f"Best: mlogloss {best['mlogloss']:.4f} accuracy {best['accuracy']:.4f} rounds {best['rounds']} {best['params']}")
+    bundle = fit_final(args.source, best, args.output_dir, args.balance, args.seed)
+    total_seconds = time.perf_counter() - start
+    print(f"Saved model version {bundle.version} to {args.output_dir}")
+    print(f"Search: {search_seconds:.1f}s for {len(candidates)} candidates x {args.folds} folds "
+          f"(fold preparation {prepare_seconds:.1f}s); with final fit {total_seconds:.1f}s")
+
+    if args.baseline:
+        start = time.perf_counter()
+        search = run_baseline(args.source, candidates, args.workers, args.folds, args.balance, args.seed)
+        baseline_seconds = time.perf_counter() - start
+        print(f"Notebook baseline: {baseline_seconds:.1f}s (best mlogloss {-search.best_score_:.4f}); "
+              f"harness is {baseline_seconds / search_seconds:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from model_bundle import ARTIFACT_DIR, get_bundle
+from preprocessing import CANADA_LABEL, DEMANDS, FEATURE_COLUMNS
+
+# Default sweep: participants on a log scale, every duration from a same-day protest to a
+# year, and every region the model knows (40 x 365 x 7 = 102,200 scenarios)
+PARTICIPANTS_RANGE = (10, 1_000_000)
+PARTICIPANT_STEPS = 40
+DURATION_RANGE = (1, 365)
+
+# Number of swept grids kept in memory per model version
+GRID_CACHE_SIZE = 32
+
+
+def participant_axis(low=PARTICIPANTS_RANGE[0], high=PARTICIPANTS_RANGE[1], steps=PARTICIPANT_STEPS):
+    """
+    Whole participant counts from `low` to `high`, evenly spaced on a log scale.
+    """
+    return np.unique(np.round(np.geomspace(low, high, steps)).astype(np.int64))
+
+
+def duration_axis(low=DURATION_RANGE[0], high=DURATION_RANGE[1]):
+    """
+    Protest durations in days, as entered in the app (1 = same-day protest).
+    """
+    return np.arange(low, high + 1, dtype=np.int64)
+
+
+def split_thresholds(booster):
+    """
+    Sorted distinct split thresholds of every feature across all trees of the booster,
+    as {feature index: float32 array}.
+    """
+    model = json.loads(booster.save_raw('json'))
+    thresholds = {}
+    for tree in model['learner']['gradient_booster']['model']['trees']:
+        inner = np.asarray(tree['left_children']) != -1
+        features = np.asarray(tree['split_indices'])[inner]
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)[inner]
+        for feature in np.unique(features):
+            thresholds.setdefault(int(feature), []).append(conditions[features == feature])
+    return {feature: np.unique(np.concatenate(parts)) for feature, parts in thresholds.items()}
+
+
+def _split_bins(values, thresholds):
+    """
+    Groups the encoded values of one feature by the interval of split thresholds they fall
+    in. Values in the same interval take the same branch in every tree (a node sends x left
+    when x < threshold), so only one of them has to be scored. Returns the positions of the
+    representatives and, for every value, the index of its representative.
+    """
+    if thresholds is None:
+        return np.zeros(1, dtype=np.int64), np.zeros(len(values), dtype=np.int64)
+    bins = np.searchsorted(thresholds, values, side='right')
+    _, first, inverse = np.unique(bins, return_index=True, return_inverse=True)
+    return first, inverse
+
+
+class WhatIfGrid:
+    """
+    Class probabilities of a base scenario swept over regions x durations x participants.
+    `probabilities` has shape (regions, durations, participants, classes); `scored_rows`
+    is the number of rows the booster actually scored for the grid.
+    """
+
+    def __init__(self, scenario, regions, durations, participants, classes, probabilities, scored_rows, seconds):
+        self.scenario = scenario
+        self.regions = regions
+        self.durations = durations
+        self.participants = participants
+        self.classes = classes
+        self.probabilities = probabilities
+        self.scored_rows = scored_rows
+        self.seconds = seconds
+
+    @property
+    def size(self):
+        return len(self.regions) * len(self.durations) * len(self.participants)
+
+    def response(self, label):
+        """
+        Probability of one state response over the grid, shape (regions, durations, participants).
+        """
+        return self.probabilities[..., list(self.classes).index(label)]
+
+    def region(self, region):
+        """
+        The (durations, participants, classes) slice of one region.
+        """
+        return self.probabilities[self.regions.index(region)]
+
+
+class WhatIfEngine:
+    """
+    predict_proba over whole grids of scenarios in a single booster call. The sweep is
+    exact but only scores one representative per combination of split-threshold intervals
+    of the swept features (see _split_bins), which shrinks the default 102k-point grid to a
+    few thousand rows. Grids are cached per base scenario; since region, duration and
+    participants are swept, only the demands and protester violence make up the key.
+    """
+
+    def __init__(self, bundle, cache_size=GRID_CACHE_SIZE):
+        self.bundle = bundle
+        self.version = bundle.version
+        self.cache_size = cache_size
+        self.thresholds = split_thresholds(bundle.model.get_booster())
+        self.regions = [region if region != "Canada" else CANADA_LABEL for region in bundle.le_region.classes_]
+        self.classes = list(bundle.le_state_response.classes_)
+        self._grids = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def base_key(scenario):
+        return tuple(int(scenario.get(key, 0)) for key in list(DEMANDS) + ['protesterviolence'])
+
+    def sweep(self, scenario, participants=None, durations=None, regions=None):
+        """
+        Probabilities of every state response for `scenario` (as entered in the app) with
+        its region, duration and participants replaced by every combination of `regions`,
+        `durations` (days) and `participants`. Defaults to the full default grid.
+        """
+        participants = participant_axis() if participants is None else np.asarray(participants, dtype=np.int64)
+        durations = duration_axis() if durations is None else np.asarray(durations, dtype=np.int64)
+        regions = list(self.regions if regions is None else regions)
+        if participants.min() < 1 or durations.min() < 1:
+            raise ValueError("protest_duration and participants_numeric must be at least 1")
+
+        key = (self.base_key(scenario), tuple(regions), durations.tobytes(), participants.tobytes())
+        with self._lock:
+            grid = self._grids.get(key)
+            if grid is not None:
+                self._grids.move_to_end(key)
+                self.hits += 1
+                return grid
+        grid = self._sweep(scenario, regions, durations, participants)
+        with self._lock:
+            self.misses += 1
+            self._grids[key] = grid
+            self._grids.move_to_end(key)
+            while len(self._grids) > self.cache_size:
+                self._grids.popitem(last=False)
+        return grid
+
+    def _sweep(self, scenario, regions, durations, participants):
+        start = time.perf_counter()
+        encoder = self.bundle.encoder
+
+        # Encoded axes, computed like FeatureEncoder (float64 scaling, then float32)
+        axes = [
+            np.array([encoder.region_code(region) for region in regions], dtype=np.float32),
+            ((durations - 1 - encoder.duration_mean) / encoder.duration_scale).astype(np.float32),
+            ((participants - encoder.participants_mean) / encoder.participants_scale).astype(np.float32),
+        ]
+        bins = [_split_bins(axis, self.thresholds.get(feature)) for feature, axis in enumerate(axes)]
+        representatives = [axis[first] for axis, (first, _) in zip(axes, bins)]
+        shape = tuple(len(axis) for axis in representatives)
+
+        # One row per distinct combination, base scenario flags in the remaining columns
+        rows = np.empty(shape + (len(FEATURE_COLUMNS),), dtype=np.float32)
+        rows[..., 0] = representatives[0][:, None, None]
+        rows[..., 1] = representatives[1][None, :, None]
+        rows[..., 2] = representatives[2][None, None, :]
+        rows[..., 3] = int(scenario.get('protesterviolence', 0))
+        rows[..., 4:] = [int(scenario.get(key, 0)) for key in FEATURE_COLUMNS[4:]]
+        probabilities = self.bundle.model.predict_proba(rows.reshape(-1, len(FEATURE_COLUMNS)))
+
+        probabilities = probabilities.reshape(shape + (len(self.classes),))
+        probabilities = probabilities[np.ix_(*(inverse for _, inverse in bins))]
+        return WhatIfGrid(scenario, regions, durations, participants, self.classes, probabilities,
+                          int(np.prod(shape)), time.perf_counter() - start)
+
+
+def heatmap_figure(grid, region, response):
+    """
+    Sensitivity heatmap of one region: probability of `response` by participants (log
+    axis) and duration.
+    """
+    import plotly.graph_objects as go
+
+    figure = go.Figure(go.Heatmap(
+        x=grid.participants, y=grid.durations, z=grid.response(response)[grid.regions.index(region)],
+        zmin=0, zmax=1, colorscale='Reds', colorbar=dict(title='Probability'),
+        hovertemplate='Participants: %{x:,}<br>Duration: %{y} days<br>Probability: %{z:.1%}<extra></extra>',
+    ))
+    figure.update_layout(title=f"Probability of {response} in {region}",
+                         xaxis=dict(type='log', title='Participants'),
+                         yaxis=dict(title='Protest Duration (days)'))
+    return figure
+
+
+# Process-wide engine, recreated when the model bundle changes
+_lock = threading.Lock()
+_engine = None
+
+
+def get_engine(bundle=None):
+    global _engine
+    bundle = bundle or get_bundle()
+    with _lock:
+        if _engine is None or _engine.version != bundle.version:
+            _engine = WhatIfEngine(bundle)
+        return _engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep a protest scenario over regions, durations and participants.")
+    parser.add_argument('--demand', action='append', default=[], choices=list(DEMANDS), help="demand flag to set (repeatable)")
+    parser.add_argument('--protester-violence', action='store_true')
+    parser.add_argument('--participant-steps', type=int, default=PARTICIPANT_STEPS)
+    parser.add_argument('--max-duration', type=int, default=DURATION_RANGE[1])
+    parser.add_argument('--repeat', type=int, default=5, help="cold sweeps timed (the grid cache is bypassed)")
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR, help="directory holding the model artifacts")
+    args = parser.parse_args(argv)
+
+    scenario = {key: 1 for key in args.demand}
+    scenario['protesterviolence'] = int(args.protester_violence)
+    participants = participant_axis(steps=args.participant_steps)
+    durations = duration_axis(high=args.max_duration)
+    engine = WhatIfEngine(get_bundle(args.artifact_dir))
+
+    timings = []
+    for _ in range(args.repeat):
+        grid = engine._sweep(scenario, engine.regions, durations, participants)
+        timings.append(grid.seconds)
+    start = time.perf_counter()
+    engine.sweep(scenario, participants, durations)
+    engine.sweep(scenario, participants, durations)
+    cached = time.perf_counter() - start
+
+    print(f"{grid.size:,} scenarios ({grid.scored_rows:,} rows scored): median {np.median(timings) * 1000:.1f} ms, "
+          f"best {min(timings) * 1000:.1f} ms, cold+cached {cached * 1000:.1f} ms", file=sys.stderr)
+    for region in grid.regions:
+        mean = grid.region(region).mean(axis=(0, 1))
+        print(region, ' '.join(f"{label}={p:.3f}" for label, p in zip(grid.classes, mean)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import joblib
+import pandas as pd
+
+# Default location of the saved classifier versions (relative to the repository root)
+ARTIFACT_DIR = 'sentiment_analysis/artifacts'
+
+# File in ARTIFACT_DIR naming the version served by default
+LATEST_FILE = 'latest.json'
+
+PIPELINE_FILE = 'pipeline.pkl'
+MANIFEST_FILE = 'manifest.json'
+
+# Vectorized equivalent of tweet_sentiment.clean_text, applied before the vectorizer
+_CLEANING_STEPS = [
+    (r"http\S+|www\S+|https\S+", ''),  # Remove URLs
+    (r'\@\w+|\#', ''),  # Remove @ and # characters
+    (r'\d+', ''),  # Remove numbers
+]
+
+
+def clean_texts(texts):
+    """
+    Cleans a sequence of raw tweet texts with pandas string methods (same rules as
+    tweet_sentiment.clean_text; missing texts become empty strings).
+    """
+    texts = pd.Series(texts, dtype=object)
+    cleaned = texts.where(texts.map(type) == str, '')
+    for pattern, replacement in _CLEANING_STEPS:
+        cleaned = cleaned.str.replace(pattern, replacement, regex=True)
+    return cleaned.str.lower().str.replace(r'[^\w\s]', '', regex=True)
+
+
+class ClassifierBundle:
+    """
+    A fitted text pipeline (vectorizer + classifier) together with its manifest.
+    `version` is the content hash of the pickled pipeline.
+    """
+
+    def __init__(self, pipeline, manifest, load_seconds=0.0):
+        self.pipeline = pipeline
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.classes = list(pipeline.classes_)
+        self.load_seconds = load_seconds
+
+
+def _write_json(path, data):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def save_bundle(pipeline, manifest, artifact_dir=ARTIFACT_DIR):
+    """
+    Saves `pipeline` as a new version under `artifact_dir` and makes it the latest one.
+    Returns the version, a hash of the pickled pipeline, so refitting identical data and
+    settings gives the same version.
+    """
+    os.makedirs(artifact_dir, exist_ok=True)
+    tmp_path = os.path.join(artifact_dir, PIPELINE_FILE + '.tmp')
+    joblib.dump(pipeline, tmp_path)
+    digest = hashlib.sha256()
+    with open(tmp_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    version = digest.hexdigest()[:12]
+
+    version_dir = os.path.join(artifact_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+    os.replace(tmp_path, os.path.join(version_dir, PIPELINE_FILE))
+    _write_json(os.path.join(version_dir, MANIFEST_FILE), dict(manifest, version=version))
+    # Written last, so a half-saved version is never served
+    _write_json(os.path.join(artifact_dir, LATEST_FILE), {'version': version})
+    return version
+
+
+def latest_version(artifact_dir=ARTIFACT_DIR):
+    with open(os.path.join(artifact_dir, LATEST_FILE)) as f:
+        return json.load(f)['version']
+
+
+def load_bundle(artifact_dir=ARTIFACT_DIR, version=None):
+    version = version or latest_version(artifact_dir)
+    version_dir = os.path.join(artifact_dir, version)
+    start = time.perf_counter()
+    pipeline = joblib.load(os.path.join(version_dir, PIPELINE_FILE))
+    with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    return ClassifierBundle(pipeline, manifest, time.perf_counter() - start)
+
+
+# Process-wide cache of loaded versions. Versions are immutable, so only the
+# latest pointer has to be checked again.
+_lock = threading.Lock()
+_bundles = {}
+
+
+def get_bundle(artifact_dir=ARTIFACT_DIR, version=None):
+    """
+    Returns the requested (default: latest) classifier version, loading it once per process.
+    """
+    version = version or latest_version(artifact_dir)
+    key = (os.path.abspath(artifact_dir), version)
+    with _lock:
+        bundle = _bundles.get(key)
+        if bundle is None:
+            bundle = _bundles[key] = load_bundle(artifact_dir, version)
+        return bundle
+
+
+def clear_cache():
+    with _lock:
+        _bundles.clear()
@@ -0,0 +1,77 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from classifier_bundle import ARTIFACT_DIR, clean_texts, get_bundle
+
+# Rows read and classified per sparse batch
+CHUNK_ROWS = 100_000
+
+
+def classify_texts(texts, bundle):
+    """
+    Classifies raw tweet texts in one sparse batch. Repeated texts (retweets) are
+    vectorized and scored once. Returns (labels, probabilities), with probability
+    columns in `bundle.classes` order.
+    """
+    codes, unique = pd.factorize(pd.Series(texts, dtype=object).fillna(''))
+    if len(unique) == 0:
+        return np.empty(0, dtype=object), np.empty((0, len(bundle.classes)))
+    proba = bundle.pipeline.predict_proba(clean_texts(unique))
+    proba = proba[codes]
+    labels = np.asarray(bundle.classes, dtype=object)[proba.argmax(axis=1)]
+    return labels, proba
+
+
+def classify_frame(df, bundle):
+    """
+    Returns `df` without 'text' plus the predicted sentiment and one proba_<class> column per class.
+    """
+    labels, proba = classify_texts(df['text'], bundle)
+    result = df.drop(columns='text')
+    result['sentiment'] = labels
+    for i, label in enumerate(bundle.classes):
+        result[f'proba_{label.lower()}'] = proba[:, i]
+    return result
+
+
+def classify_csv(source, bundle, chunk_rows=CHUNK_ROWS):
+    """
+    Yields classified chunks of a tweets CSV (path or file-like object).
+    """
+    for chunk in pd.read_csv(source, chunksize=chunk_rows, dtype={'text': str}):
+        yield classify_frame(chunk, bundle)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify tweet sentiment with a saved classifier bundle.")
+    parser.add_argument('input', help="tweets CSV with a 'text' column ('-' for stdin)")
+    parser.add_argument('output', help="output CSV ('-' for stdout)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR)
+    parser.add_argument('--version', default=None, help="bundle version (default: latest)")
+    args = parser.parse_args(argv)
+
+    bundle = get_bundle(args.artifact_dir, args.version)
+    source = sys.stdin if args.input == '-' else args.input
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+
+    start = time.perf_counter()
+    rows = 0
+    try:
+        for i, chunk in enumerate(classify_csv(source, bundle, args.chunk_rows)):
+            chunk.to_csv(output, header=(i == 0), index=False)
+            rows += len(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(f"Classified {rows} tweets with version {bundle.version} in {elapsed:.2f}s "
+          f"({rows / max(elapsed, 1e-9):,.0f} tweets/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
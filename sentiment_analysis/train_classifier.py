@@ -0,0 +1,117 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import BernoulliNB
+from sklearn.pipeline import Pipeline
+
+from classifier_bundle import ARTIFACT_DIR, clean_texts, save_bundle
+from tweet_sentiment import TWEETS_PATH, TweetScorer
+
+# Vocabulary size of the TF-IDF vectorizer / number of hashed features
+MAX_FEATURES = 50_000
+HASH_FEATURES = 2 ** 18
+
+VECTORIZERS = ['tfidf', 'hashing']
+MODELS = ['logistic', 'bernoulli_nb']
+
+
+def build_pipeline(vectorizer='tfidf', model='logistic'):
+    """
+    Sparse text pipeline: word unigrams and bigrams, TF-IDF weighted. 'hashing' replaces the
+    fitted vocabulary with a stateless HashingVectorizer, which keeps memory flat for large
+    corpora and makes the artifact small.
+    """
+    if vectorizer == 'tfidf':
+        steps = [('vectorizer', TfidfVectorizer(ngram_range=(1, 2), min_df=2, max_features=MAX_FEATURES,
+                                                stop_words='english', sublinear_tf=True, dtype=np.float32))]
+    elif vectorizer == 'hashing':
+        steps = [
+            ('vectorizer', HashingVectorizer(ngram_range=(1, 2), n_features=HASH_FEATURES, stop_words='english',
+                                             alternate_sign=False, norm=None, dtype=np.float32)),
+            ('tfidf', TfidfTransformer(sublinear_tf=True)),
+        ]
+    else:
+        raise ValueError(f"unknown vectorizer: {vectorizer}")
+
+    if model == 'logistic':
+        steps.append(('classifier', LogisticRegression(C=10.0, max_iter=1000, random_state=42)))
+    elif model == 'bernoulli_nb':
+        steps.append(('classifier', BernoulliNB()))
+    else:
+        raise ValueError(f"unknown model: {model}")
+    return Pipeline(steps)
+
+
+def load_training_data(source, label_column='sentiment'):
+    """
+    Reads the tweets and their sentiment labels. Without a label column, tweets are labeled
+    with the TextBlob sentiment category used throughout the sentiment analysis.
+    """
+    df = pd.read_csv(source, dtype={'text': str})
+    if label_column not in df.columns:
+        scored = pd.concat(TweetScorer().score_file(source), ignore_index=True)
+        df[label_column] = scored['sentiment'].to_numpy()
+    return df['text'], df[label_column].astype(str)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the tweet sentiment classifier and save a versioned bundle.")
+    parser.add_argument('input', nargs='?', default=TWEETS_PATH, help="tweets CSV with a 'text' column")
+    parser.add_argument('--label-column', default='sentiment', help="label column (TextBlob labels when missing)")
+    parser.add_argument('--vectorizer', choices=VECTORIZERS, default='tfidf')
+    parser.add_argument('--model', choices=MODELS, default='logistic')
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR)
+    args = parser.parse_args(argv)
+
+    texts, labels = load_training_data(args.input, args.label_column)
+
+    start = time.perf_counter()
+    cleaned = clean_texts(texts)
+    clean_seconds = time.perf_counter() - start
+
+    # Held-out evaluation, then the saved pipeline is refitted on every tweet
+    X_train, X_test, y_train, y_test = train_test_split(cleaned, labels, test_size=args.test_size,
+                                                        random_state=42, stratify=labels)
+    pipeline = build_pipeline(args.vectorizer, args.model)
+    pipeline.fit(X_train, y_train)
+    test_accuracy = accuracy_score(y_test, pipeline.predict(X_test))
+    print(f"Test Accuracy: {test_accuracy:.4f}")
+    print(classification_report(y_test, pipeline.predict(X_test)))
+
+    pipeline = build_pipeline(args.vectorizer, args.model)
+    start = time.perf_counter()
+    pipeline.fit(cleaned, labels)
+    fit_seconds = clean_seconds + time.perf_counter() - start
+
+    start = time.perf_counter()
+    pipeline.predict(clean_texts(texts))
+    predict_seconds = time.perf_counter() - start
+
+    manifest = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'source': args.input,
+        'rows': len(texts),
+        'label_column': args.label_column,
+        'vectorizer': args.vectorizer,
+        'model': args.model,
+        'classes': sorted(labels.unique()),
+        'test_accuracy': test_accuracy,
+        'sklearn_version': sklearn.__version__,
+    }
+    version = save_bundle(pipeline, manifest, args.artifact_dir)
+    print(f"Saved version {version} to {args.artifact_dir}")
+    print(f"fit: {len(texts) / fit_seconds:,.0f} tweets/s ({fit_seconds:.2f}s); "
+          f"predict: {len(texts) / predict_seconds:,.0f} tweets/s ({predict_seconds:.2f}s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+import argparse
+import os
+import re
+import sys
+import time
+import warnings
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Tweet export scored by default
+TWEETS_PATH = 'data/tweets.csv'
+
+TWEET_COLUMNS = ['link', 'text', 'date', 'no_of_likes', 'no_of_comments']
+
+# Format of the 'date' column, e.g. "Jul 21, 2024 · 5:02 PM UTC"
+DATE_FORMAT = '%b %d, %Y · %I:%M %p UTC'
+
+# Rows read per chunk; together with MAX_PENDING_CHUNKS this bounds memory use
+CHUNK_ROWS = 50_000
+MAX_PENDING_CHUNKS = 2
+
+# Unique texts sent to a worker in one task
+TASK_TEXTS = 2_000
+
+# Scored texts remembered across chunks (retweets repeat the same text many times)
+MEMO_SIZE = 200_000
+
+SENTIMENTS = ['Positive', 'Neutral', 'Negative']
+
+# Per-process text resources, loaded once by init_worker
+_stop_words = frozenset()
+_lemmatize = None
+
+
+def clean_text(text):
+    if isinstance(text, str):  # Check if text is a string
+        text = re.sub(r"http\S+|www\S+|https\S+", '', text, flags=re.MULTILINE)  # Remove URLs
+        text = re.sub(r'\@\w+|\#', '', text)  # Remove @ and # characters
+        text = re.sub(r'\d+', '', text)  # Remove numbers
+        text = text.lower()  # Convert to lowercase
+        text = re.sub(r'[^\w\s]', '', text)  # Remove punctuation
+        return text
+    else:
+        return ''  # Return an empty string if text is not a string
+
+
+def preprocess_text(text):
+    # The cleaned text has no punctuation left, so splitting on whitespace tokenizes it
+    tokens = [word for word in text.split() if word not in _stop_words]
+    if _lemmatize is not None:
+        tokens = [_lemmatize(word) for word in tokens]
+    return ' '.join(tokens)
+
+
+def sentiment_category(polarity):
+    return 'Positive' if polarity > 0 else ('Negative' if polarity < 0 else 'Neutral')
+
+
+def init_worker():
+    """
+    Loads the NLTK stopwords and WordNet lemmatizer once per process (downloading them like
+    the notebooks do when missing). Without the corpora, tweets are scored without
+    stopword removal and lemmatization.
+    """
+    global _stop_words, _lemmatize
+    import nltk
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+
+    for resource, path in [('stopwords', 'corpora/stopwords'), ('wordnet', 'corpora/wordnet')]:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(resource, quiet=True)
+    try:
+        _stop_words = frozenset(stopwords.words('english'))
+    except LookupError:
+        warnings.warn("NLTK stopwords are not available; stopwords are kept")
+    try:
+        lemmatizer = WordNetLemmatizer()
+        lemmatizer.lemmatize('protests')
+        _lemmatize = lemmatizer.lemmatize
+    except LookupError:
+        warnings.warn("NLTK WordNet is not available; tokens are not lemmatized")
+
+
+def score_texts(texts):
+    """
+    Cleans, preprocesses and scores a list of raw tweet texts with TextBlob.
+    Returns a (polarity, subjectivity) pair per text.
+    """
+    from textblob import TextBlob
+
+    scores = []
+    for text in texts:
+        sentiment = TextBlob(preprocess_text(clean_text(text))).sentiment
+        scores.append((sentiment.polarity, sentiment.subjectivity))
+    return scores
+
+
+class TweetAggregates:
+    """
+    Running hourly and daily sentiment aggregates. Only per-period sums are kept, so memory
+    grows with the number of hours covered, not with the number of tweets.
+    """
+
+    COLUMNS = ['tweets', 'polarity_sum'] + SENTIMENTS
+
+    def __init__(self):
+        self.sums = {'hourly': None, 'daily': None}
+
+    def add(self, scored):
+        timestamps = pd.to_datetime(scored['date'], format=DATE_FORMAT, errors='coerce')
+        values = pd.DataFrame({'tweets': 1, 'polarity_sum': scored['polarity']})
+        for sentiment in SENTIMENTS:
+            values[sentiment] = (scored['sentiment'] == sentiment).astype(int)
+        valid = timestamps.notna()
+        for period, freq in [('hourly', 'h'), ('daily', 'D')]:
+            part = values[valid].groupby(timestamps[valid].dt.floor(freq)).sum()
+            current = self.sums[period]
+            self.sums[period] = part if current is None else current.add(part, fill_value=0)
+
+    def frame(self, period):
+        sums = self.sums[period]
+        if sums is None:
+            sums = pd.DataFrame(columns=self.COLUMNS)
+        result = sums.sort_index().astype({column: 'int64' for column in ['tweets'] + SENTIMENTS})
+        result.insert(1, 'mean_polarity', result['polarity_sum'] / result['tweets'])
+        result.index.name = 'hour' if period == 'hourly' else 'day'
+        return result.drop(columns='polarity_sum').reset_index()
+
+
+class TweetScorer:
+    """
+    Streams a tweet export through a process pool in chunks. Each chunk's texts are
+    deduplicated and looked up in a bounded memo of already scored texts; only the remaining
+    unique texts are fanned out to the workers. At most `max_pending` chunks are in flight.
+    """
+
+    def __init__(self, workers=None, chunk_rows=CHUNK_ROWS, max_pending=MAX_PENDING_CHUNKS, memo_size=MEMO_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_rows = chunk_rows
+        self.max_pending = max_pending
+        self.memo_size = memo_size
+        self.memo = OrderedDict()
+        self.stats = {'tweets': 0, 'scored_texts': 0, 'memo_hits': 0}
+
+    def _submit(self, pool, chunk):
+        texts = chunk['text'].fillna('').astype(str)
+        # Memo hits are copied now: collecting an earlier pending chunk may evict them
+        known, unique = {}, []
+        for text in texts.unique():
+            score = self.memo.get(text)
+            if score is None:
+                unique.append(text)
+            else:
+                known[text] = score
+                self.memo.move_to_end(text)
+        self.stats['memo_hits'] += len(texts) - len(unique)
+        tasks = [
+            (unique[i:i + TASK_TEXTS], pool.submit(score_texts, unique[i:i + TASK_TEXTS]))
+            for i in range(0, len(unique), TASK_TEXTS)
+        ]
+        return chunk, texts, known, tasks
+
+    def _collect(self, chunk, texts, known, tasks):
+        scores = {}
+        for batch, future in tasks:
+            scores.update(zip(batch, future.result()))
+            self.stats['scored_texts'] += len(batch)
+
+        polarity, subjectivity = [], []
+        for text in texts:
+            score = scores[text] if text in scores else known[text]
+            polarity.append(score[0])
+            subjectivity.append(score[1])
+
+        for text, score in scores.items():
+            self.memo[text] = score
+        while len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+
+        scored = chunk.drop(columns='text')
+        scored['polarity'] = polarity
+        scored['subjectivity'] = subjectivity
+        scored['sentiment'] = [sentiment_category(p) for p in polarity]
+        self.stats['tweets'] += len(scored)
+        return scored
+
+    def score_file(self, source):
+        """
+        Yields one scored frame per chunk of `source` (path or file-like object), in order:
+        the input columns without 'text', plus polarity, subjectivity and sentiment.
+        """
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker) as pool:
+            for chunk in pd.read_csv(source, chunksize=self.chunk_rows, dtype={'text': str, 'date': str}):
+                pending.append(self._submit(pool, chunk))
+                if len(pending) >= self.max_pending:
+                    yield self._collect(*pending.popleft())
+            while pending:
+                yield self._collect(*pending.popleft())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score tweet sentiment (TextBlob polarity) with hourly/daily aggregates.")
+    parser.add_argument('input', nargs='?', default=TWEETS_PATH, help="tweet export ('-' for stdin)")
+    parser.add_argument('--output', help="per-tweet scores CSV ('-' for stdout)")
+    parser.add_argument('--hourly', help="hourly aggregates CSV")
+    parser.add_argument('--daily', help="daily aggregates CSV")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    scorer = TweetScorer(workers=args.workers, chunk_rows=args.chunk_rows)
+    aggregates = TweetAggregates()
+    source = sys.stdin if args.input == '-' else args.input
+    output = None
+    if args.output:
+        output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+
+    start = time.perf_counter()
+    try:
+        for i, scored in enumerate(scorer.score_file(source)):
+            aggregates.add(scored)
+            if output is not None:
+                scored.to_csv(output, header=(i == 0), index=False)
+    finally:
+        if output not in (None, sys.stdout):
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    if args.hourly:
+        aggregates.frame('hourly').to_csv(args.hourly, index=False)
+    if args.daily:
+        aggregates.frame('daily').to_csv(args.daily, index=False)
+    if not (args.output or args.hourly or args.daily):
+        print(aggregates.frame('daily').to_string(index=False))
+
+    stats = scorer.stats
+    print(f"Scored {stats['tweets']} tweets in {elapsed:.2f}s ({stats['tweets'] / max(elapsed, 1e-9):,.0f} tweets/s) "
+          f"with {scorer.workers} workers; {stats['scored_texts']} unique texts scored, "
+          f"{stats['memo_hits']} duplicates served from the memo", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+import bisect
+import os
+import threading
+import time
+import warnings
+from contextlib import ContextDecorator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+__all__ = [
+    'BUCKETS', 'PORT_ENV', 'FILE_ENV', 'DEBUG_ENV', 'Histogram', 'increment', 'observe', 'current_app',
+    'stage', 'start_rerun', 'finish_rerun', 'summarize', 'render_prometheus', 'write_metrics_file',
+    'start_http_server', 'debug_enabled', 'show_breakdown',
+]
+
+# Histogram buckets of the stage timings, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Environment variables enabling the exporters and the debug sidebar
+PORT_ENV = 'METRICS_PORT'
+FILE_ENV = 'METRICS_FILE'
+DEBUG_ENV = 'METRICS_DEBUG'
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+# Process-wide metrics, shared by every session and rerun
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_server = None
+
+# Stage breakdown of the rerun running on this thread (Streamlit runs each script in its own thread)
+_local = threading.local()
+
+
+def _labels(**labels):
+    return tuple(sorted(labels.items()))
+
+
+def increment(name, amount=1, **labels):
+    key = (name, _labels(**labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    key = (name, _labels(**labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def current_app():
+    return getattr(_local, 'app', 'unknown')
+
+
+class stage(ContextDecorator):
+    """
+    Times a block (or, as a decorator, a function) as the named stage: the duration is
+    added to the stage histogram and to the breakdown of the current rerun.
+
+        with stage('query'):
+            ...
+
+    A decorated function gets a fresh stage per call, so it can be called concurrently or
+    recursively.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def _recreate_cm(self):
+        return stage(self.name)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        app = current_app()
+        observe('app_stage_seconds', seconds, app=app, stage=self.name)
+        if exc_type is not None:
+            increment('app_stage_errors_total', app=app, stage=self.name)
+        breakdown = getattr(_local, 'breakdown', None)
+        if breakdown is not None:
+            breakdown.append((self.name, seconds))
+        return False
+
+
+def start_rerun(app):
+    """
+    Marks the start of a script run of `app`; stages timed on this thread until
+    finish_rerun() make up its breakdown.
+    """
+    _local.app = app
+    _local.breakdown = []
+    _local.start = time.perf_counter()
+
+
+def finish_rerun():
+    """
+    Records the total run time and returns the run's breakdown as a list of
+    (stage, seconds) pairs, ending with ('total', seconds).
+    """
+    app = current_app()
+    total = time.perf_counter() - getattr(_local, 'start', time.perf_counter())
+    breakdown = getattr(_local, 'breakdown', None) or []
+    breakdown.append(('total', total))
+    observe('app_rerun_seconds', total, app=app)
+    increment('app_reruns_total', app=app)
+    _local.breakdown = None
+    write_metrics_file()
+    return breakdown
+
+
+def summarize(breakdown):
+    """
+    Sums a breakdown per stage (a stage can run several times per rerun), in first-seen order.
+    Returns (stage, calls, milliseconds) rows.
+    """
+    totals = {}
+    for name, seconds in breakdown:
+        calls, total = totals.get(name, (0, 0.0))
+        totals[name] = (calls + 1, total + seconds)
+    return [(name, calls, total * 1000) for name, (calls, total) in totals.items()]
+
+
+def _format_labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in items) + '}'
+
+
+def render_prometheus():
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    with _lock:
+        histograms = {key: (list(h.counts), h.sum, h.count) for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    for metric in sorted({name for name, _ in histograms}):
+        lines.append(f'# TYPE {metric} histogram')
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_format_labels(labels, le=bound)} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, le="+Inf")} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+    for metric in sorted({name for name, _ in counters}):
+        lines.append(f'# TYPE {metric} counter')
+        for (name, labels), value in sorted(counters.items()):
+            if name == metric:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics_file(path=None):
+    """
+    Writes the metrics to `path` (default: $METRICS_FILE, if set), replacing it atomically
+    so a node exporter textfile collector never reads a partial file.
+    """
+    path = path or os.environ.get(FILE_ENV)
+    if not path:
+        return
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port=None, host='127.0.0.1'):
+    """
+    Serves /metrics on `port` (default: $METRICS_PORT, if set) from a daemon thread.
+    Started at most once per process, however many sessions call it.
+    """
+    global _server
+    port = port or os.environ.get(PORT_ENV)
+    if not port:
+        return None
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as error:
+                warnings.warn(f"metrics endpoint not started on port {port}: {error}")
+                return None
+            threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+        return _server
+
+
+def debug_enabled(query_params=None):
+    """
+    The debug sidebar is shown when $METRICS_DEBUG is set or the page URL has ?debug=timings.
+    """
+    if os.environ.get(DEBUG_ENV):
+        return True
+    return query_params is not None and query_params.get('debug') == 'timings'
+
+
+def show_breakdown(container, breakdown):
+    """
+    Writes a rerun's stage breakdown as a table to a Streamlit container (e.g. st.sidebar).
+    """
+    container.header("Rerun Timings")
+    container.table([
+        {'stage': name, 'calls': calls, 'ms': round(ms, 2)}
+        for name, calls, ms in summarize(breakdown)
+    ])
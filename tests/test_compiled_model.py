@@ -0,0 +1,32 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+# The tools import their modules by bare name, relative to their own directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'predictor_model'))
+
+from artifacts import ARTIFACT_FILES  # noqa: E402
+from compiled_model import COMPILED_FILE, get_compiled  # noqa: E402
+from preprocessing import FEATURE_COLUMNS  # noqa: E402
+
+
+def test_stale_compiled_model_is_refused(tmp_path):
+    for file in list(ARTIFACT_FILES.values()) + [COMPILED_FILE]:
+        shutil.copy(os.path.join(REPO_ROOT, 'predictor_model', file), tmp_path)
+    assert get_compiled(str(tmp_path)).version
+
+    # Retrained artifacts without a new export
+    with open(tmp_path / ARTIFACT_FILES['model'], 'a') as f:
+        f.write(' ')
+    with pytest.raises(ValueError, match='export_compiled.py'):
+        get_compiled(str(tmp_path))
+
+
+def test_compiled_model_deploys_on_its_own(tmp_path):
+    shutil.copy(os.path.join(REPO_ROOT, 'predictor_model', COMPILED_FILE), tmp_path)
+    model = get_compiled(str(tmp_path))
+    assert model.predict_proba(np.zeros((2, len(FEATURE_COLUMNS)), dtype=np.float32)).shape == (2, len(model.classes))
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# The tools import their modules by bare name, relative to their own directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'visual_deployment'))
+
+from data_store import COLUMNS, SOURCE_PATH  # noqa: E402
+from event_index import RESPONSE_COLUMNS, EventIndex, popcount  # noqa: E402
+
+
+def test_popcount():
+    rng = np.random.default_rng(0)
+    bitmap = rng.integers(0, 256, 10_000, dtype=np.uint8)
+    assert popcount(bitmap) == int(np.unpackbits(bitmap).sum())
+    assert popcount(np.zeros(0, dtype=np.uint8)) == 0
+
+
+def test_counts_match_boolean_masks():
+    df = pd.read_csv(os.path.join(REPO_ROOT, SOURCE_PATH), usecols=COLUMNS)
+    index = EventIndex(df)
+    in_years = df['year'].between(2000, 2015)
+    brutality = df['demand_police_brutality'] == 1
+    for level in ['region', 'country']:
+        for entity in index.entities(level)[:5]:
+            mask = (df[level] == entity) & in_years & brutality
+            assert index.count(level, entity, (2000, 2015), ['demand_police_brutality']) == mask.sum()
+            crosstab = index.crosstab(level, entity, (2000, 2015), ['demand_police_brutality'], RESPONSE_COLUMNS)
+            expected = [(mask & (df[column] == 1)).sum() for column in RESPONSE_COLUMNS]
+            assert crosstab[0].tolist() == expected
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The tools import their modules by bare name, relative to their own directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'predictor_model'))
+
+from model_bundle import get_bundle  # noqa: E402
+from preprocessing import CANADA_LABEL, FEATURE_COLUMNS, prepare_features  # noqa: E402
+
+DATA_PATH = os.path.join(REPO_ROOT, 'visual_deployment', 'mass_mobilization_cleaned.csv')
+
+
+@pytest.fixture(scope='module')
+def bundle():
+    return get_bundle(os.path.join(REPO_ROOT, 'predictor_model'))
+
+
+@pytest.fixture(scope='module')
+def df():
+    df = pd.read_csv(DATA_PATH, usecols=FEATURE_COLUMNS)
+    # Half of the Canadian protests under the label the app shows
+    canada = df.index[df['region'] == 'Canada']
+    assert len(canada)
+    df.loc[canada[::2], 'region'] = CANADA_LABEL
+    return df
+
+
+def test_encoder_matches_prepare_features(bundle, df):
+    reference = prepare_features(df, bundle).to_numpy(dtype=np.float32)
+    rows = df[FEATURE_COLUMNS].to_dict('records')
+
+    # Bit for bit, not just close: compare the raw float32 bytes
+    assert bundle.encoder.encode_frame(df).tobytes() == reference.tobytes()
+    assert bundle.encoder.encode_rows(rows).tobytes() == reference.tobytes()
+    for row, expected in zip(rows, reference):
+        assert bundle.encoder.encode_row(row).tobytes() == expected.tobytes()
+
+
+def test_canada_label(bundle, df):
+    row = df[FEATURE_COLUMNS].iloc[0].to_dict()
+    row['region'] = CANADA_LABEL
+    canada = dict(row, region='Canada')
+    assert bundle.encoder.encode_row(row).tobytes() == bundle.encoder.encode_row(canada).tobytes()
+
+
+def test_unknown_region(bundle, df):
+    unknown = df.head(3).copy()
+    unknown.loc[unknown.index[1], 'region'] = 'Atlantis'
+    rows = unknown.to_dict('records')
+    with pytest.raises(ValueError, match='unknown region: Atlantis'):
+        bundle.encoder.encode_frame(unknown)
+    with pytest.raises(ValueError, match='unknown region: Atlantis'):
+        bundle.encoder.encode_rows(rows)
+    with pytest.raises(ValueError, match='unknown region: Atlantis'):
+        bundle.encoder.encode_row(rows[1])
+    with pytest.raises(ValueError):
+        prepare_features(unknown, bundle)
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The tools import their modules by bare name, relative to their own directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'visual_deployment'))
+
+from data_store import COLUMNS, SOURCE_PATH, _read_manifest, _write_columns, load_segments  # noqa: E402
+from ingest import avg_hyphen, clean_record, ingest, synthetic_records  # noqa: E402
+
+
+def test_avg_hyphen_needs_exactly_one_hyphen():
+    assert avg_hyphen('100-200') == 150
+    assert avg_hyphen('1-2-3') is None
+
+
+def test_bad_records_are_rejected_not_raised(tmp_path):
+    records = list(synthetic_records(20))
+    records[3]['participants'] = '1-2-3'
+    records[7]['endyear'] = records[7]['startyear'] + 200  # 73,000 days: overflows int16
+    records[11]['participants'] = '3000000000'  # overflows int32
+    assert clean_record(records[7]) is None
+    assert clean_record(records[11]) is None
+
+    counts, _ = ingest(records, os.path.join(REPO_ROOT, SOURCE_PATH), str(tmp_path))
+    assert counts['read'] == 20
+    assert counts['written'] + counts['rejected'] == 20
+    assert counts['rejected'] >= 3
+
+    manifest = _read_manifest(str(tmp_path))
+    segments = load_segments(str(tmp_path), manifest['segments'])
+    assert len(segments) == counts['written']
+    assert segments['protest_duration'].max() <= 366
+    assert segments['participants_numeric'].min() > 0
+
+
+def test_write_columns_refuses_values_that_would_wrap(tmp_path):
+    df = pd.DataFrame({column: [0, 0] for column in COLUMNS})
+    df['region'], df['country'] = 'Africa', 'Kenya'
+    df['protest_duration'] = [40000, 1]
+    with pytest.raises(ValueError, match='protest_duration'):
+        _write_columns(str(tmp_path / 'segment'), df)
+    assert not os.path.exists(tmp_path / 'segment' / 'region.npy')
+    df['protest_duration'] = [1, 1]
+    _write_columns(str(tmp_path / 'segment'), df)
+    assert np.load(tmp_path / 'segment' / 'protest_duration.npy').dtype == np.int16
@@ -0,0 +1,23 @@
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from shared.instrumentation import finish_rerun, stage, start_rerun  # noqa: E402
+
+
+def test_decorated_stage_times_recursive_calls():
+    @stage('recursive')
+    def recurse(depth):
+        time.sleep(0.01)
+        if depth:
+            recurse(depth - 1)
+
+    start_rerun('test')
+    recurse(2)
+    timings = [seconds for name, seconds in finish_rerun() if name == 'recursive']
+    # Inner calls finish first; every outer call includes the calls it made
+    assert timings == sorted(timings)
+    assert timings[-1] >= 0.03
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pandas as pd
+
+# The tools import their modules by bare name, relative to their own directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'sentiment_analysis'))
+
+import tweet_sentiment  # noqa: E402
+from tweet_sentiment import TweetScorer, score_texts  # noqa: E402
+
+TEXTS = ['aa good', 'bb bad', 'aa good', 'cc not great', 'dd awful', 'aa good', 'bb bad', 'ee the goods']
+
+# Stand-ins for the NLTK resources init_worker loads, so nothing is downloaded and the
+# workers preprocess exactly like the reference scored in the test process
+STOP_WORDS = frozenset(['not', 'the'])
+LEMMAS = {'goods': 'good'}
+
+
+def lemmatize(word):
+    return LEMMAS.get(word, word)
+
+
+def init_test_worker():
+    tweet_sentiment._stop_words = STOP_WORDS
+    tweet_sentiment._lemmatize = lemmatize
+
+
+def test_memo_eviction_while_chunks_are_pending(tmp_path, monkeypatch):
+    monkeypatch.setattr(tweet_sentiment, 'init_worker', init_test_worker)
+    monkeypatch.setattr(tweet_sentiment, '_stop_words', STOP_WORDS)
+    monkeypatch.setattr(tweet_sentiment, '_lemmatize', lemmatize)
+
+    # Two-row chunks with a two-text memo: texts found in the memo when a chunk is
+    # submitted are evicted by the previous chunk's collection before this one is collected
+    source = tmp_path / 'tweets.csv'
+    pd.DataFrame({'date': 'Jan 01, 2020 · 01:00 PM UTC', 'text': TEXTS}).to_csv(source, index=False)
+
+    scorer = TweetScorer(workers=1, chunk_rows=2, max_pending=2, memo_size=2)
+    scored = pd.concat(scorer.score_file(str(source)), ignore_index=True)
+
+    expected = score_texts(TEXTS)
+    # The stopword and lemma stand-ins change these scores, so both sides used them
+    assert expected[3][0] > 0 and expected[7] == score_texts(['good'])[0]
+    assert list(scored['polarity']) == [polarity for polarity, _ in expected]
+    assert list(scored['subjectivity']) == [subjectivity for _, subjectivity in expected]
+    assert scorer.stats['memo_hits'] > 0
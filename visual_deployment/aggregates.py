@@ -0,0 +1,158 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_store import get_frame_and_build
+
+# Levels the dashboard drills into
+LEVELS = ['region', 'country']
+
+DEMAND_COLUMNS = [
+    'demand_labor_wage_dispute', 'demand_land_farm_issue', 'demand_police_brutality',
+    'demand_political_behavior', 'demand_price_increases', 'demand_removal_of_politician'
+]
+
+# State responses that count as state violence
+STATE_VIOLENCE_COLUMNS = ['response_beatings', 'response_shootings', 'response_killings']
+
+VIOLENCE_MEASURES = ['non_violent', 'protester_violence', 'state_violence', 'both_violence']
+
+# Measures held for every (level, entity, year); demand counts keep their column names
+MEASURES = ['protests', 'protest_duration', 'participants_numeric'] + DEMAND_COLUMNS + VIOLENCE_MEASURES
+
+# Measures counting matching protests. Like value_counts on the filtered rows, their
+# series leave out the years without a matching protest.
+COUNT_MEASURES = set(DEMAND_COLUMNS + VIOLENCE_MEASURES)
+
+_EMPTY = (np.empty(0, dtype=np.int16), np.empty((0, len(MEASURES)), dtype=np.int64))
+
+
+def event_measures(df):
+    """
+    Per-event values of every measure (one row per event, columns in MEASURES order).
+    The violence categories are derived here once instead of on every query.
+    """
+    protester_violence = df['protesterviolence'].to_numpy() == 1
+    state_violence = df[STATE_VIOLENCE_COLUMNS].to_numpy().sum(axis=1) > 0
+    measures = {
+        'protests': np.ones(len(df), dtype=np.int64),
+        'protest_duration': df['protest_duration'].to_numpy(dtype=np.int64),
+        'participants_numeric': df['participants_numeric'].to_numpy(dtype=np.int64),
+    }
+    for column in DEMAND_COLUMNS:
+        measures[column] = (df[column].to_numpy() == 1).astype(np.int64)
+    measures.update({
+        'non_violent': (~protester_violence).astype(np.int64),
+        'protester_violence': protester_violence.astype(np.int64),
+        'state_violence': state_violence.astype(np.int64),
+        'both_violence': (protester_violence & state_violence).astype(np.int64),
+    })
+    return pd.DataFrame(measures, columns=MEASURES)
+
+
+class AggregateCube:
+    """
+    Sums of every measure keyed by (level, entity, year). Each entity holds a sorted
+    array of years and a matching (years x measures) matrix, so a year-range query is
+    two binary searches and a slice. New events can be folded in with `append`, which
+    bumps `version` so cached query results can be told apart.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tables = {level: {} for level in LEVELS}
+        self.rows = 0
+        self.version = 0
+
+    @classmethod
+    def from_frame(cls, df):
+        cube = cls()
+        cube.append(df)
+        return cube
+
+    def append(self, df):
+        """
+        Aggregates the events in `df` and adds them to the cube.
+        """
+        if df.empty:
+            return
+        measures = event_measures(df)
+        years = df['year'].to_numpy(dtype=np.int16)
+        with self._lock:
+            for level in LEVELS:
+                entities = df[level].astype(str).to_numpy()
+                grouped = measures.groupby([entities, years], sort=True).sum()
+                for entity, part in grouped.groupby(level=0, sort=False):
+                    self._merge(level, entity, part.index.get_level_values(1).to_numpy(dtype=np.int16),
+                                part.to_numpy(dtype=np.int64))
+            self.rows += len(df)
+            self.version += 1
+
+    def _merge(self, level, entity, years, values):
+        current = self.tables[level].get(entity)
+        if current is None:
+            self.tables[level][entity] = (years, values)
+            return
+        old_years, old_values = current
+        merged_years = np.union1d(old_years, years)
+        merged = np.zeros((len(merged_years), len(MEASURES)), dtype=np.int64)
+        merged[np.searchsorted(merged_years, old_years)] += old_values
+        merged[np.searchsorted(merged_years, years)] += values
+        # Replaced as a whole so concurrent readers always see a consistent pair
+        self.tables[level][entity] = (merged_years, merged)
+
+    def entities(self, level):
+        return list(self.tables[level])
+
+    def long_frame(self, level, measure):
+        """
+        Every (entity, year) of `level` with its value of `measure`, as a long DataFrame.
+        """
+        column = MEASURES.index(measure)
+        parts = [
+            pd.DataFrame({level: entity, 'year': years.astype(np.int64), measure: values[:, column]})
+            for entity, (years, values) in list(self.tables[level].items())
+        ]
+        if not parts:
+            return pd.DataFrame(columns=[level, 'year', measure])
+        return pd.concat(parts, ignore_index=True)
+
+    def series(self, level, entity, measure, year_range):
+        """
+        Years and values of `measure` for `entity` within the inclusive `year_range`.
+        """
+        years, values = self.tables[level].get(entity, _EMPTY)
+        lo = np.searchsorted(years, year_range[0], side='left')
+        hi = np.searchsorted(years, year_range[1], side='right')
+        years, column = years[lo:hi], values[lo:hi, MEASURES.index(measure)]
+        if measure in COUNT_MEASURES:
+            keep = column > 0
+            years, column = years[keep], column[keep]
+        return years, column
+
+    def frame(self, level, entity, measure, year_range, value_name=None):
+        """
+        `series` as a two-column DataFrame ('year' and `value_name`, default the measure name).
+        """
+        years, values = self.series(level, entity, measure, year_range)
+        return pd.DataFrame({'year': years.astype(np.int64), value_name or measure: values})
+
+
+# Process-wide cube. Rebuilt when the data store reloads its frame from scratch; rows
+# appended to the store since the cube was built are folded in incrementally.
+_lock = threading.Lock()
+_cube = None
+_cube_build = None
+
+
+def get_cube():
+    global _cube, _cube_build
+    df, build = get_frame_and_build()
+    with _lock:
+        if _cube is None or _cube_build != build:
+            _cube = AggregateCube.from_frame(df)
+            _cube_build = build
+        elif len(df) > _cube.rows:
+            _cube.append(df.iloc[_cube.rows:])
+        return _cube
@@ -0,0 +1,139 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from instrumentation import stage
+
+# Series longer than this are downsampled (LTTB) before charting; the CSV keeps every row
+MAX_POINTS = 1000
+
+# Number of rendered views (figure, label, file name and CSV) kept in memory per engine
+VIEW_CACHE_SIZE = 256
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling: the indices of `threshold` points of the
+    series (x, y) that keep its visual shape (peaks, troughs and both end points).
+    Returns all indices when the series is not longer than `threshold`.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket edges over the interior points; the first and last points are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Average point of every bucket, used as the third triangle corner for the previous one
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        area = np.abs((x[a] - avg_x[bucket + 1]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (avg_y[bucket + 1] - y[a]))
+        a = lo + int(area.argmax())
+        indices[bucket + 1] = a
+    return indices
+
+
+def downsample(data, x, y, max_points=MAX_POINTS):
+    """
+    `data` reduced to at most `max_points` rows of its (x, y) series with LTTB.
+    """
+    if len(data) <= max_points:
+        return data
+    return data.iloc[lttb(data[x].to_numpy(), data[y].to_numpy(), max_points)].reset_index(drop=True)
+
+
+def compact(data):
+    """
+    `data` with every numeric column in the narrowest dtype that holds its values exactly,
+    so Plotly encodes them as small typed arrays (e.g. years as int16) in the figure JSON.
+    """
+    columns = {}
+    for name in data.columns:
+        column = data[name]
+        if pd.api.types.is_integer_dtype(column):
+            columns[name] = pd.to_numeric(column, downcast='integer')
+        elif pd.api.types.is_float_dtype(column):
+            narrow = column.astype(np.float32)
+            columns[name] = narrow if np.array_equal(narrow.to_numpy(), column.to_numpy(), equal_nan=True) else column
+        else:
+            columns[name] = column
+    return pd.DataFrame(columns)
+
+
+def chart_data(data, x, y, max_points=MAX_POINTS):
+    """
+    The rows of a query result that actually go into a chart: downsampled and compacted.
+    """
+    return compact(downsample(data, x, y, max_points))
+
+
+def figure_json(figure):
+    """
+    The figure as sent to the browser (Plotly JSON with base64 typed arrays).
+    """
+    return pio.to_json(figure, validate=False)
+
+
+class CsvDownload:
+    """
+    Deferred CSV bytes of a DataFrame for st.download_button: serialized on the first
+    call (i.e. when the button is clicked) and reused afterwards.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._csv = None
+
+    def __call__(self):
+        if self._csv is None:
+            with stage('csv'):
+                self._csv = self.data.to_csv(index=False).encode('utf-8')
+        return self._csv
+
+
+class ViewCache:
+    """
+    LRU cache of rendered views keyed by the view's arguments and the cube version, so a
+    rerun that shows the same chart again skips building the figure. Cached figures are
+    shared across sessions and must be treated as read-only.
+    """
+
+    def __init__(self, cache_size=VIEW_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                self.hits += 1
+                return view
+        view = build()
+        with self._lock:
+            self.misses += 1
+            self._views[key] = view
+            self._views.move_to_end(key)
+            while len(self._views) > self.cache_size:
+                self._views.popitem(last=False)
+        return view
+
+    def __len__(self):
+        return len(self._views)
@@ -0,0 +1,81 @@
+import threading
+import weakref
+
+import pandas as pd
+import plotly.express as px
+
+from aggregates import DEMAND_COLUMNS
+from chart_render import CsvDownload, ViewCache, chart_data
+from event_index import RESPONSE_COLUMNS
+from instrumentation import stage
+from query_engine import DEMAND_MAPPING
+
+# Friendly state response names
+RESPONSE_MAPPING = {
+    'response_ignore': 'Ignore',
+    'response_accomodation': 'Accommodation',
+    'response_crowd_dispersal': 'Crowd Dispersal',
+    'response_arrests': 'Arrests',
+    'response_beatings': 'Beatings',
+    'response_shootings': 'Shootings',
+    'response_killings': 'Killings'
+}
+
+# Filters offered on the Cross-Tab page: friendly name -> indexed flag
+FILTERS = {
+    'Protester Violence': 'protesterviolence',
+    'State Violence': 'state_violence',
+    **{name: column for column, name in DEMAND_MAPPING.items()},
+    **{f"Response: {name}": column for column, name in RESPONSE_MAPPING.items()},
+}
+
+# Rendered views of every event index, dropped together with the index
+_lock = threading.Lock()
+_view_caches = weakref.WeakKeyDictionary()
+
+
+def view_cache(index):
+    with _lock:
+        cache = _view_caches.get(index)
+        if cache is None:
+            cache = _view_caches[index] = ViewCache()
+        return cache
+
+
+def crosstab_view(index, level, entity, year_range, filters=(), file_prefix=''):
+    """
+    Demands x state responses of the events of one region or country within `year_range`
+    that match every filter (names of FILTERS): the count table, its heatmap, the yearly
+    number of matching events and the CSV download. Views are cached per index, so they
+    must be treated as read-only.
+    """
+    filters = tuple(filters)
+    key = (level, entity, tuple(year_range), filters, file_prefix)
+
+    def build():
+        flags = [FILTERS[name] for name in filters]
+        with stage('crosstab'):
+            counts = index.crosstab(level, entity, year_range, DEMAND_COLUMNS, RESPONSE_COLUMNS, flags)
+            matches = index.count(level, entity, year_range, flags)
+            years, totals = index.yearly(level, entity, year_range, flags)
+        data = pd.DataFrame(counts, index=pd.Index([DEMAND_MAPPING[c] for c in DEMAND_COLUMNS], name='demand'),
+                            columns=[RESPONSE_MAPPING[c] for c in RESPONSE_COLUMNS])
+        trend = pd.DataFrame({'year': years, 'protests_count': totals})
+        title = " AND ".join(filters) or "All Protests"
+        with stage('figure'):
+            chart = px.imshow(data, text_auto=True, aspect='auto', color_continuous_scale='Reds',
+                              labels=dict(x='State Response', y='Demand', color='Protests'),
+                              title=f"Demands by State Response: {title}")
+            trend_chart = px.line(chart_data(trend, 'year', 'protests_count'), x='year', y='protests_count',
+                                  title=f"Protests per Year: {title}", labels={'protests_count': 'Protests Count'})
+        return {
+            'data': data,
+            'matches': matches,
+            'chart': chart,
+            'trend': trend_chart,
+            'csv': CsvDownload(data.reset_index()),
+            'label': "Download Cross-Tab Data",
+            'file_name': f'{file_prefix}_crosstab.csv',
+        }
+
+    return view_cache(index).get(key, build)
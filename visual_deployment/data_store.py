@@ -0,0 +1,293 @@
+import itertools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Cleaned dataset produced by Data_Cleaning.ipynb (relative to the repository root, like the app)
+SOURCE_PATH = 'visual_deployment/mass_mobilization_cleaned.csv'
+
+# Directory holding the columnar copy of the dataset
+STORE_DIR = 'visual_deployment/.store'
+
+# Columns stored as category codes plus a list of categories
+CATEGORICAL_COLUMNS = ['region', 'country']
+
+# Compact dtypes of the numerical columns
+COLUMN_DTYPES = {
+    'year': np.int16,
+    'protest_duration': np.int16,
+    'participants_numeric': np.int32,
+    'protesterviolence': np.uint8,
+    'demand_labor_wage_dispute': np.uint8,
+    'demand_land_farm_issue': np.uint8,
+    'demand_police_brutality': np.uint8,
+    'demand_political_behavior': np.uint8,
+    'demand_price_increases': np.uint8,
+    'demand_removal_of_politician': np.uint8,
+    'response_ignore': np.uint8,
+    'response_accomodation': np.uint8,
+    'response_crowd_dispersal': np.uint8,
+    'response_arrests': np.uint8,
+    'response_beatings': np.uint8,
+    'response_shootings': np.uint8,
+    'response_killings': np.uint8,
+}
+
+COLUMNS = CATEGORICAL_COLUMNS + list(COLUMN_DTYPES)
+
+# Process-wide cache of the loaded frame, shared by every session and rerun
+_lock = threading.Lock()
+_frames = {}
+_build_ids = itertools.count(1)
+_stats = {'hits': 0, 'misses': 0, 'builds': 0, 'last_load_seconds': 0.0}
+
+
+def _source_signature(source):
+    stat = os.stat(source)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, 'manifest.json')
+
+
+def _manifest_signature(store_dir):
+    try:
+        stat = os.stat(_manifest_path(store_dir))
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read_manifest(store_dir):
+    try:
+        with open(_manifest_path(store_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(store_dir, manifest):
+    # Replaced atomically, so readers never see a half-written manifest
+    path = _manifest_path(store_dir)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.tmp', path)
+
+
+def _write_columns(directory, df):
+    """
+    Writes every column of `df` as a .npy file in its compact dtype and returns the
+    categories of the categorical columns. Files are replaced atomically so processes
+    that still memory-map the old version are not affected. Raises ValueError, before
+    anything is written, when a value doesn't fit its column's dtype.
+    """
+    os.makedirs(directory, exist_ok=True)
+    arrays = {}
+    categories = {}
+    for column in CATEGORICAL_COLUMNS:
+        values = pd.Categorical(df[column])
+        categories[column] = [str(c) for c in values.categories]
+        arrays[column] = values.codes.astype(np.int16)
+    for column, dtype in COLUMN_DTYPES.items():
+        values = df[column].to_numpy()
+        info = np.iinfo(dtype)
+        if len(values) and (values.min() < info.min or values.max() > info.max):
+            raise ValueError(f"{column} values outside the {np.dtype(dtype).name} range "
+                             f"[{info.min}, {info.max}]: {values.min()}..{values.max()}")
+        arrays[column] = values.astype(dtype)
+
+    for column, values in arrays.items():
+        path = os.path.join(directory, f'{column}.npy')
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, values)
+        os.replace(path + '.tmp', path)
+    return categories
+
+
+def build_store(source=SOURCE_PATH, store_dir=STORE_DIR):
+    """
+    Parses the CSV once and writes every column as a .npy file in its compact dtype:
+    category codes for region/country, int16 year, uint8 flags. The manifest records the
+    source file signature so a changed CSV invalidates the store. Appended segments are
+    kept, since their events are not part of the CSV.
+    """
+    df = pd.read_csv(source, usecols=COLUMNS, dtype=COLUMN_DTYPES)
+    previous = _read_manifest(store_dir) or {}
+    categories = _write_columns(store_dir, df)
+
+    manifest = {
+        'source': os.path.abspath(source),
+        'source_signature': _source_signature(source),
+        'rows': len(df),
+        'categories': categories,
+        'segments': previous.get('segments', []),
+    }
+    # Written last, so an interrupted build is never mistaken for a valid store
+    _write_manifest(store_dir, manifest)
+    return manifest
+
+
+def append_frame(df, source=SOURCE_PATH, store_dir=STORE_DIR):
+    """
+    Appends cleaned events (a frame with COLUMNS) to the store as a new segment, without
+    rewriting the existing data. Meant for a single writer process, such as ingest.py.
+    """
+    manifest = _read_manifest(store_dir)
+    if not _store_is_current(source, store_dir, manifest):
+        manifest = build_store(source, store_dir)
+    name = os.path.join('segments', f"{len(manifest['segments']) + 1:06d}")
+    categories = _write_columns(os.path.join(store_dir, name), df)
+    manifest['segments'].append({'path': name, 'rows': len(df), 'categories': categories})
+    _write_manifest(store_dir, manifest)
+    return manifest
+
+
+def _load_columns(directory, categories):
+    columns = {}
+    for column in COLUMNS:
+        values = np.load(os.path.join(directory, f'{column}.npy'), mmap_mode='r')
+        if column in CATEGORICAL_COLUMNS:
+            columns[column] = pd.Categorical.from_codes(values, categories=categories[column])
+        else:
+            columns[column] = values
+    return pd.DataFrame(columns)
+
+
+def concat_frames(frames):
+    """
+    Concatenates store frames, merging the categories of region/country (existing
+    categories keep their codes, new ones are added at the end).
+    """
+    frames = [frame for frame in frames if len(frame)] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for column in COLUMNS:
+        if column in CATEGORICAL_COLUMNS:
+            columns[column] = union_categoricals([frame[column] for frame in frames])
+        else:
+            columns[column] = np.concatenate([frame[column].to_numpy() for frame in frames])
+    return pd.DataFrame(columns)
+
+
+def load_segments(store_dir, segments):
+    return concat_frames([
+        _load_columns(os.path.join(store_dir, segment['path']), segment['categories'])
+        for segment in segments
+    ])
+
+
+def load_store(store_dir, manifest):
+    """
+    Memory-maps the stored columns (base and appended segments) and assembles them into
+    a DataFrame with categorical region/country columns.
+    """
+    base = _load_columns(store_dir, manifest['categories'])
+    if not manifest['segments']:
+        return base
+    return concat_frames([base, load_segments(store_dir, manifest['segments'])])
+
+
+def _store_is_current(source, store_dir, manifest):
+    return (
+        manifest is not None
+        and 'segments' in manifest
+        and manifest['source'] == os.path.abspath(source)
+        and manifest['source_signature'] == _source_signature(source)
+    )
+
+
+def get_frame_and_build(source=SOURCE_PATH, store_dir=STORE_DIR):
+    """
+    Returns the dataset as a typed DataFrame, cached per process, together with a build id.
+    The columnar store is (re)built from the CSV only when the CSV changed since the store
+    was written. When only new segments were appended, just those are loaded and the build
+    id stays the same: within one build a newer frame only ever extends an older one with
+    rows at the end, so consumers such as the aggregate cube can update incrementally.
+    """
+    key = (source, store_dir)
+    signature = (_source_signature(source), _manifest_signature(store_dir))
+
+    with _lock:
+        cached = _frames.get(key)
+        if cached is not None and cached['signature'] == signature:
+            _stats['hits'] += 1
+            return cached['frame'], cached['build']
+
+        _stats['misses'] += 1
+        start = time.perf_counter()
+        manifest = _read_manifest(store_dir)
+        if not _store_is_current(source, store_dir, manifest):
+            manifest = build_store(source, store_dir)
+            _stats['builds'] += 1
+            signature = (_source_signature(source), _manifest_signature(store_dir))
+
+        segments = manifest['segments']
+        if (cached is not None and cached['base'] == manifest['source_signature']
+                and cached['segments'] == segments[:len(cached['segments'])]):
+            frame = concat_frames([cached['frame'], load_segments(store_dir, segments[len(cached['segments']):])])
+            build = cached['build']
+        else:
+            frame = load_store(store_dir, manifest)
+            build = next(_build_ids)
+
+        _stats['last_load_seconds'] = time.perf_counter() - start
+        _frames[key] = {
+            'signature': signature,
+            'frame': frame,
+            'build': build,
+            'base': manifest['source_signature'],
+            'segments': segments,
+        }
+        return frame, build
+
+
+def get_frame(source=SOURCE_PATH, store_dir=STORE_DIR):
+    return get_frame_and_build(source, store_dir)[0]
+
+
+def cache_stats():
+    with _lock:
+        return dict(_stats)
+
+
+def clear_cache():
+    with _lock:
+        _frames.clear()
+
+
+def report(source=SOURCE_PATH, store_dir=STORE_DIR, repeat=5):
+    """
+    Compares load time and memory footprint of parsing the CSV against the columnar store.
+    """
+    def best_time(func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        return min(timings), result
+
+    csv_seconds, csv_frame = best_time(lambda: pd.read_csv(source))
+    manifest = _read_manifest(store_dir)
+    if not _store_is_current(source, store_dir, manifest):
+        manifest = build_store(source, store_dir)
+    store_seconds, store_frame = best_time(lambda: load_store(store_dir, manifest))
+
+    csv_bytes = csv_frame.memory_usage(deep=True).sum()
+    store_bytes = store_frame.memory_usage(deep=True).sum()
+    print(f"{'':<16}{'load time':>12}{'memory':>12}")
+    print(f"{'read_csv':<16}{csv_seconds * 1000:>9.1f} ms{csv_bytes / 1024:>9.0f} KB")
+    print(f"{'columnar store':<16}{store_seconds * 1000:>9.1f} ms{store_bytes / 1024:>9.0f} KB")
+    print(f"{len(store_frame)} rows; {csv_seconds / store_seconds:.1f}x faster, "
+          f"{csv_bytes / store_bytes:.1f}x smaller")
+
+
+if __name__ == '__main__':
+    report()
@@ -0,0 +1,192 @@
+import threading
+
+import numpy as np
+
+from aggregates import DEMAND_COLUMNS, LEVELS, STATE_VIOLENCE_COLUMNS
+from data_store import get_frame_and_build
+
+RESPONSE_COLUMNS = [
+    'response_ignore', 'response_accomodation', 'response_crowd_dispersal', 'response_arrests',
+    'response_beatings', 'response_shootings', 'response_killings'
+]
+
+# Flags with a bitmap index; 'state_violence' is derived (any of STATE_VIOLENCE_COLUMNS)
+FLAG_COLUMNS = ['protesterviolence', 'state_violence'] + DEMAND_COLUMNS + RESPONSE_COLUMNS
+
+# Measures kept in index order for sums over filtered events
+VALUE_COLUMNS = ['protest_duration', 'participants_numeric']
+
+# Number of set bits of every byte value (np.bitwise_count needs NumPy 2)
+POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+def popcount(bitmap):
+    """
+    Number of set bits in a bitmap.
+    """
+    return int(POPCOUNT[bitmap].sum(dtype=np.int64))
+
+
+def pack(flags):
+    """
+    Packs a boolean array into a bitmap: event i is bit i % 8 of byte i // 8.
+    """
+    return np.packbits(flags, bitorder='little')
+
+
+class EventIndex:
+    """
+    The event table sorted by (region, country, year), with an offset table per level so
+    the events of any region or country are one contiguous run of rows. Within a country
+    the years are sorted, so a country/year-range query is a slice found by two binary
+    searches; a region's year range is the union of its countries' slices. Every flag of
+    FLAG_COLUMNS is held as a packed bitmap in the same order, so combined filters such as
+    "police brutality AND state violence in Africa, 2000-2015" are bitwise ANDs over the
+    bytes of the entity's run, counted with a popcount lookup table.
+
+        index.count('region', 'Africa', (2000, 2015), ['demand_police_brutality', 'state_violence'])
+
+    Every country belongs to a single region (raises ValueError otherwise).
+    """
+
+    def __init__(self, df):
+        regions = df['region'].astype('category')
+        countries = df['country'].astype('category')
+        years = df['year'].to_numpy(dtype=np.int16)
+        self.order = np.lexsort((years, countries.cat.codes.to_numpy(), regions.cat.codes.to_numpy()))
+        self.years = years[self.order]
+
+        # Offset table per level: entity -> (first row, end row) in index order
+        self.offsets = {}
+        region_codes = regions.cat.codes.to_numpy()[self.order]
+        for level, column in zip(LEVELS, [regions, countries]):
+            codes = column.cat.codes.to_numpy()[self.order]
+            starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+            ends = np.r_[starts[1:], len(codes)]
+            entities = [str(entity) for entity in column.cat.categories[codes[starts]]]
+            if len(set(entities)) != len(entities):
+                raise ValueError(f"the events of a {level} are not contiguous (a country in several regions?)")
+            self.offsets[level] = {entity: (int(lo), int(hi)) for entity, lo, hi in zip(entities, starts, ends)}
+            if level == 'country':
+                # Countries of every region, in index order
+                self.countries = {str(region): [] for region in self.offsets['region']}
+                for entity, region in zip(entities, regions.cat.categories[region_codes[starts]]):
+                    self.countries[str(region)].append(entity)
+
+        flags = {column: df[column].to_numpy() == 1 for column in FLAG_COLUMNS if column != 'state_violence'}
+        flags['state_violence'] = df[STATE_VIOLENCE_COLUMNS].to_numpy().sum(axis=1) > 0
+        self.bitmaps = {column: pack(flags[column][self.order]) for column in FLAG_COLUMNS}
+        self.values = {column: df[column].to_numpy(dtype=np.int64)[self.order] for column in VALUE_COLUMNS}
+
+    def __len__(self):
+        return len(self.order)
+
+    def entities(self, level):
+        return list(self.offsets[level])
+
+    def span(self, country, year_range):
+        """
+        The (first, end) rows, in index order, of `country`'s events within the inclusive
+        `year_range`.
+        """
+        lo, hi = self.offsets['country'].get(country, (0, 0))
+        years = self.years[lo:hi]
+        return (lo + int(np.searchsorted(years, year_range[0], side='left')),
+                lo + int(np.searchsorted(years, year_range[1], side='right')))
+
+    def bitmap(self, lo, hi, flags=()):
+        """
+        The bytes of the rows [lo, hi) with every flag in `flags` set, as a bitmap starting
+        at row (lo // 8) * 8. Bits of rows outside [lo, hi) are cleared.
+        """
+        first, end = lo >> 3, (hi + 7) >> 3
+        if flags:
+            selected = self.bitmaps[flags[0]][first:end].copy()
+            for flag in flags[1:]:
+                selected &= self.bitmaps[flag][first:end]
+        else:
+            selected = np.full(end - first, 0xFF, dtype=np.uint8)
+        if len(selected):
+            selected[0] &= (0xFF << (lo & 7)) & 0xFF
+            selected[-1] &= 0xFF >> ((8 - hi) & 7)
+        return selected
+
+    def selection(self, level, entity, year_range, flags=()):
+        """
+        `entity`'s events within `year_range` with every flag in `flags` set, as
+        (first, bitmap): a bitmap over the entity's run of rows starting at row `first`
+        (a multiple of 8).
+        """
+        flags = list(flags)
+        if level == 'country':
+            lo, hi = self.span(entity, year_range)
+            return lo & ~7, self.bitmap(lo, hi, flags)
+        lo, hi = self.offsets['region'].get(entity, (0, 0))
+        first = lo & ~7
+        in_range = np.zeros(hi - first, dtype=bool)
+        for country in self.countries.get(entity, []):
+            start, end = self.span(country, year_range)
+            in_range[start - first:end - first] = True
+        return first, pack(in_range) & self.bitmap(lo, hi, flags)
+
+    def rows(self, level, entity, year_range, flags=()):
+        """
+        Index-order row numbers of the matching events.
+        """
+        first, selected = self.selection(level, entity, year_range, flags)
+        return first + np.flatnonzero(np.unpackbits(selected, bitorder='little'))
+
+    def count(self, level, entity, year_range, flags=()):
+        """
+        Number of `entity`'s events within `year_range` with every flag in `flags` set.
+        """
+        _, selected = self.selection(level, entity, year_range, flags)
+        return popcount(selected)
+
+    def yearly(self, level, entity, year_range, flags=(), value=None):
+        """
+        Per-year number of matching events (or sum of the `value` column over them) as
+        (years, totals) arrays. Like value_counts on the filtered rows, years without a
+        matching event are left out.
+        """
+        rows = self.rows(level, entity, year_range, flags)
+        years, positions = np.unique(self.years[rows], return_inverse=True)
+        weights = None if value is None else self.values[value][rows]
+        return years.astype(np.int64), np.bincount(positions, weights, len(years)).astype(np.int64)
+
+    def crosstab(self, level, entity, year_range, rows, columns, filters=()):
+        """
+        Counts of `entity`'s events within `year_range` with every flag in `filters` set,
+        for every pair of a flag in `rows` and a flag in `columns`, as a
+        (len(rows), len(columns)) array.
+        """
+        first, selected = self.selection(level, entity, year_range, filters)
+        first, end = first >> 3, (first >> 3) + len(selected)
+        counts = np.zeros((len(rows), len(columns)), dtype=np.int64)
+        for i, row in enumerate(rows):
+            row_selected = selected & self.bitmaps[row][first:end]
+            for j, column in enumerate(columns):
+                counts[i, j] = popcount(row_selected & self.bitmaps[column][first:end])
+        return counts
+
+    def events(self, level, entity, year_range, flags=()):
+        """
+        Positions, in the indexed frame, of the matching events (for df.iloc), in index order.
+        """
+        return self.order[self.rows(level, entity, year_range, flags)]
+
+
+# Process-wide index, rebuilt when the data store reloads its frame or receives new rows
+_lock = threading.Lock()
+_index = None
+_index_key = None
+
+
+def get_index():
+    global _index, _index_key
+    df, build = get_frame_and_build()
+    with _lock:
+        if _index is None or _index_key != (build, len(df)):
+            _index = EventIndex(df)
+            _index_key = (build, len(df))
+        return _index
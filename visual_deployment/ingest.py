@@ -0,0 +1,402 @@
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+from functools import lru_cache
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from aggregates import DEMAND_COLUMNS, AggregateCube
+from data_store import COLUMN_DTYPES, COLUMNS, SOURCE_PATH, STORE_DIR, append_frame, get_frame
+
+# Raw Mass Mobilization fields aggregated into the demand_*/response_* one-hot columns
+DEMAND_FIELDS = ['protesterdemand1', 'protesterdemand2', 'protesterdemand3', 'protesterdemand4']
+RESPONSE_FIELDS = [
+    'stateresponse1', 'stateresponse2', 'stateresponse3', 'stateresponse4',
+    'stateresponse5', 'stateresponse6', 'stateresponse7'
+]
+RESPONSE_COLUMNS = [column for column in COLUMNS if column.startswith('response_')]
+
+# Range of the compact store dtype of every numerical event field; events outside it
+# (e.g. a duration of 40,000 days after an end-year typo) are rejected
+VALUE_RANGES = {
+    column: (int(np.iinfo(COLUMN_DTYPES[column]).min), int(np.iinfo(COLUMN_DTYPES[column]).max))
+    for column in ['year', 'protest_duration', 'participants_numeric', 'protesterviolence']
+}
+
+# Cleaned events written to the store per segment
+BATCH_ROWS = 50_000
+
+
+# Participant parsing, as in Data_Cleaning.ipynb
+
+def parse_texts(x):
+    """
+    Parses specific textual representations of participant counts into numeric values.
+    Handles predefined text patterns like 'dozens', 'hundreds', etc.
+    """
+    x = x.lower()
+
+    text_mapping = {
+        "dozens": 50,
+        "hundreds": 500,
+        "thousands": 5000,
+        "tens of thousands": 50000,
+        "hundreds of thousands": 250000,
+        "millions": 2000000,
+        "million": 1000000,
+        "a group": 10,
+        "busloads": 50,
+        "widespread": 500,
+        "scores": 50,
+        "a few dozen": 36,
+        "a few hundred": 300,
+        "a few thousand": 3000,
+        "several 1000s": 5000,
+        "few thousand": 3000,
+        "few dozen": 24,
+    }
+
+    for key, value in text_mapping.items():
+        if key in x:
+            return value
+
+    if "about " in x:
+        match = re.search(r'\d+', x)
+        if match:
+            return int(match.group())
+    if "more than " in x:
+        match = re.search(r'\d+', x)
+        if match:
+            return int(match.group())
+
+    if "several" in x:
+        if "dozen" in x:
+            return 50
+        elif "hundred" in x:
+            return 500
+        elif "thousand" in x:
+            return 5000
+
+    return x
+
+
+def strip_chars(x):
+    """
+    Removes unwanted characters from the string and converts to integer if possible.
+    Specifically handles values ending in 's' by multiplying the preceding number by 5.
+    """
+    banned_chars = "+><,"
+    x = "".join([c for c in x if c not in banned_chars])
+
+    if x.endswith('s') and x[:-1].isdigit():
+        return int(x[:-1]) * 5
+
+    try:
+        return int(x)
+    except ValueError:
+        return x
+
+
+def avg_hyphen(x):
+    """
+    Calculates the average for values specified as a range (e.g., '100-200').
+    """
+    accepted_chars = "1234567890-"
+    x = "".join([c for c in x if c in accepted_chars])
+
+    parts = x.split("-")
+    if len(parts) == 2:
+        lower, upper = parts
+        if lower.isdigit() and upper.isdigit():
+            return (int(lower) + int(upper)) // 2
+
+    return None
+
+
+@lru_cache(maxsize=65536)
+def map_participants(x):
+    """
+    Sequentially applies parsing, stripping, and averaging to convert text representations
+    of participant counts into numeric values. Returns None when the count can't be parsed.
+    Memoized, since the raw data repeats the same few hundred texts over and over.
+    """
+    while isinstance(x, str):
+        x = parse_texts(x)
+        if isinstance(x, str):
+            x = strip_chars(x)
+        if isinstance(x, str):
+            x = avg_hyphen(x)
+    if x is None or (isinstance(x, float) and math.isnan(x)):
+        return None
+    return int(x)
+
+
+# Row-by-row cleaning
+
+def _is_missing(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value == '' or value == 'nan' or value.isspace()
+    return isinstance(value, float) and math.isnan(value)
+
+
+def _to_int(value):
+    if _is_missing(value):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def event_date(record, prefix):
+    try:
+        return date(_to_int(record.get(f'{prefix}year')), _to_int(record.get(f'{prefix}month')),
+                    _to_int(record.get(f'{prefix}day')))
+    except (TypeError, ValueError):
+        return None
+
+
+def clean_region(region, country):
+    # Canada is kept as its own region; the rest of North and Central America is "Americas"
+    if country == 'Canada':
+        return 'Canada'
+    if region in ('North America', 'Central America'):
+        return 'Americas'
+    if region == 'Oceania':
+        return None
+    return region
+
+
+@lru_cache(maxsize=4096)
+def value_columns(value, prefix):
+    # Raw values may list several items, e.g. 'political behavior, process'
+    return frozenset(prefix + part.strip().replace(' ', '_') for part in value.split(', '))
+
+
+def one_hot_columns(record, fields, prefix):
+    """
+    Column names of the values listed in `fields`, e.g. 'police brutality' -> 'demand_police_brutality'.
+    """
+    columns = set()
+    for field in fields:
+        value = record.get(field)
+        if not _is_missing(value):
+            columns.update(value_columns(str(value), prefix))
+    return columns
+
+
+def clean_record(record):
+    """
+    Applies the Data_Cleaning.ipynb rules to one raw event: participants to numeric,
+    duration from the start and end dates, demand/response one-hot columns and the region
+    grouping used by the dashboard. Returns None for events the notebook would drop
+    (non-protests, missing violence/dates/participants, empty sources or notes, Oceania)
+    and for values that don't fit the store (see VALUE_RANGES).
+    """
+    if _to_int(record.get('protest')) == 0:
+        return None
+    for field in ('sources', 'notes'):
+        if field in record and _is_missing(record[field]):
+            return None
+
+    country = None if _is_missing(record.get('country')) else str(record['country'])
+    region = None if _is_missing(record.get('region')) else clean_region(str(record['region']), country)
+    year = _to_int(record.get('year'))
+    violence = _to_int(record.get('protesterviolence'))
+    start, end = event_date(record, 'start'), event_date(record, 'end')
+    participants = record.get('participants')
+    participants = None if _is_missing(participants) else map_participants(participants)
+    if None in (country, region, year, violence, start, end, participants):
+        return None
+
+    event = {
+        'region': region,
+        'country': country,
+        'year': year,
+        'protest_duration': (end - start).days,
+        'participants_numeric': participants,
+        'protesterviolence': violence,
+    }
+    for column, (low, high) in VALUE_RANGES.items():
+        if not low <= event[column] <= high:
+            return None
+    demands = one_hot_columns(record, DEMAND_FIELDS, 'demand_')
+    responses = one_hot_columns(record, RESPONSE_FIELDS, 'response_')
+    for column in DEMAND_COLUMNS:
+        event[column] = int(column in demands)
+    for column in RESPONSE_COLUMNS:
+        event[column] = int(column in responses)
+    return event
+
+
+# Generator pipeline
+
+def read_records(stream, fmt='csv'):
+    if fmt == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from csv.DictReader(stream)
+
+
+def clean_records(records, counts):
+    for record in records:
+        counts['read'] += 1
+        try:
+            event = clean_record(record)
+        except ValueError:
+            # A malformed record is rejected rather than aborting the whole stream
+            event = None
+        if event is None:
+            counts['rejected'] += 1
+        else:
+            yield event
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ingest(records, source=SOURCE_PATH, store_dir=STORE_DIR, cube=None, batch_rows=BATCH_ROWS):
+    """
+    Streams raw records through the cleaning pipeline and appends the cleaned events to the
+    columnar store in segments of `batch_rows`; `cube` (if given) is updated incrementally
+    with each segment. Only one batch is held in memory. Returns counters and timings.
+    """
+    counts = {'read': 0, 'rejected': 0, 'written': 0, 'segments': 0}
+    timings = {'write': 0.0, 'aggregate': 0.0}
+    start = time.perf_counter()
+    for batch in batched(clean_records(records, counts), batch_rows):
+        frame = pd.DataFrame.from_records(batch, columns=COLUMNS)
+
+        step = time.perf_counter()
+        append_frame(frame, source, store_dir)
+        timings['write'] += time.perf_counter() - step
+
+        if cube is not None:
+            step = time.perf_counter()
+            cube.append(frame)
+            timings['aggregate'] += time.perf_counter() - step
+
+        counts['written'] += len(batch)
+        counts['segments'] += 1
+    timings['total'] = time.perf_counter() - start
+    timings['clean'] = timings['total'] - timings['write'] - timings['aggregate']
+    return counts, timings
+
+
+# Sources
+
+def synthetic_records(n, seed=42):
+    """
+    Raw events shaped like the Mass Mobilization export, for throughput testing.
+    """
+    rng = random.Random(seed)
+    places = [('Africa', 'Kenya'), ('Europe', 'France'), ('Asia', 'India'), ('MENA', 'Iraq'),
+              ('South America', 'Chile'), ('Central America', 'Mexico'), ('North America', 'Canada')]
+    participants = ['hundreds', 'thousands', 'dozens', '1000-2000', '50+', 'about 300', '5000s', '>100', '2,500']
+    demands = ['labor wage dispute', 'land farm issue', 'police brutality', 'political behavior, process',
+               'price increases, tax policy', 'removal of politician', 'social restrictions']
+    responses = ['ignore', 'accomodation', 'crowd dispersal', 'arrests', 'beatings', 'shootings', 'killings']
+    for i in range(n):
+        region, country = rng.choice(places)
+        year = rng.randint(1990, 2020)
+        month, day = rng.randint(1, 12), rng.randint(1, 28)
+        length = rng.choice([0, 0, 0, 1, 2, 5])
+        record = {
+            'id': i, 'country': country, 'year': year, 'region': region, 'protest': 1,
+            'startday': day, 'startmonth': month, 'startyear': year,
+            'endday': min(day + length, 28), 'endmonth': month, 'endyear': year,
+            'protesterviolence': int(rng.random() < 0.25),
+            'participants': rng.choice(participants),
+            'sources': 'synthetic', 'notes': 'synthetic event',
+        }
+        for field in DEMAND_FIELDS[:rng.randint(1, 2)]:
+            record[field] = rng.choice(demands)
+        for field in RESPONSE_FIELDS[:rng.randint(1, 3)]:
+            record[field] = rng.choice(responses)
+        yield record
+
+
+def watch_directory(directory, fmt, interval, **kwargs):
+    """
+    Ingests every file dropped into `directory` (oldest first) and moves it to
+    `directory/processed` afterwards. Runs until interrupted.
+    """
+    processed = os.path.join(directory, 'processed')
+    os.makedirs(processed, exist_ok=True)
+    pattern = '*.jsonl' if fmt == 'jsonl' else '*.csv'
+    while True:
+        for path in sorted(glob.glob(os.path.join(directory, pattern)), key=os.path.getmtime):
+            with open(path, newline='') as f:
+                counts, timings = ingest(read_records(f, fmt), **kwargs)
+            shutil.move(path, os.path.join(processed, os.path.basename(path)))
+            print_report(os.path.basename(path), counts, timings)
+        time.sleep(interval)
+
+
+def print_report(label, counts, timings):
+    rate = counts['read'] / max(timings['total'], 1e-9)
+    print(f"{label}: {counts['read']} records read, {counts['written']} events written "
+          f"({counts['rejected']} rejected) in {counts['segments']} segments, "
+          f"{timings['total']:.2f}s total ({rate:,.0f} records/s; clean {timings['clean']:.2f}s, "
+          f"write {timings['write']:.2f}s, aggregate {timings['aggregate']:.2f}s)", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream raw protest events into the dashboard's columnar store.")
+    parser.add_argument('inputs', nargs='*', help="raw event files ('-' for stdin)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--watch', metavar='DIR', help="ingest files dropped into DIR")
+    parser.add_argument('--interval', type=float, default=2.0, help="seconds between directory scans")
+    parser.add_argument('--synthetic', type=int, metavar='N',
+                        help="ingest N synthetic events into a temporary store and report throughput")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS)
+    parser.add_argument('--source', default=SOURCE_PATH)
+    parser.add_argument('--store-dir', default=None, help=f"columnar store to append to (default {STORE_DIR})")
+    args = parser.parse_args(argv)
+
+    store_dir = args.store_dir or (tempfile.mkdtemp(prefix='mm_store_') if args.synthetic else STORE_DIR)
+    cube = AggregateCube.from_frame(get_frame(args.source, store_dir))
+    options = {'source': args.source, 'store_dir': store_dir, 'cube': cube, 'batch_rows': args.batch_rows}
+
+    try:
+        if args.synthetic:
+            print_report(f"synthetic ({store_dir})", *ingest(synthetic_records(args.synthetic), **options))
+        for path in args.inputs:
+            if path == '-':
+                print_report('stdin', *ingest(read_records(sys.stdin, args.format), **options))
+            else:
+                with open(path, newline='') as f:
+                    print_report(path, *ingest(read_records(f, args.format), **options))
+        if args.watch:
+            watch_directory(args.watch, args.format, args.interval, **options)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.synthetic and args.store_dir is None:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Stage timings and the Prometheus exporter are shared by both apps and live in
+# shared/instrumentation.py at the repository root. This module re-exports them so the
+# app's modules keep importing `instrumentation` by bare name.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+from shared.instrumentation import *  # noqa: E402,F401,F403
@@ -1,6 +1,15 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+from crosstab_views import FILTERS, crosstab_view
+from data_store import get_frame
+from event_index import get_index
+from instrumentation import debug_enabled, finish_rerun, show_breakdown, stage, start_http_server, start_rerun
+from query_engine import get_engine
+from trend_views import CHART_TYPES, TABS, tab_options, trend_view
+from world_map import get_world_map
+
+# Stage timings of this run; exported on $METRICS_PORT (/metrics) and/or to $METRICS_FILE
+start_rerun('dashboard')
+start_http_server()
 
 # Custom CSS for styling
 st.markdown("""
@@ -25,11 +34,50 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# Load the cleaned dataset
-df = pd.read_csv('visual_deployment/mass_mobilization_cleaned.csv')
+# Load the cleaned dataset from the typed columnar store (built from the CSV once and
+# shared across sessions; rebuilt automatically when the CSV changes)
+with stage('load_frame'):
+    df = get_frame()
+
+# Query engine over the per (region/country, year) aggregates, built once per process
+with stage('aggregates'):
+    engine = get_engine()
+
+
+def render_trends(entity_type, entity, file_prefix):
+    """
+    Year range, tab and chart selection plus the charts and downloads for one region or
+    country. Shared by the Regional and Country pages (and any further drill-down page).
+    """
+    year_range = st.slider("Select Year Range", int(df['year'].min()), int(df['year'].max()), (int(df['year'].min()), 2020))
+
+    # Tabs for data visualization
+    tab = st.selectbox("Select Tab", TABS)
+
+    # Chart type selection
+    chart_type = st.radio("Select Chart Type", CHART_TYPES)
+
+    # Demand or violence type, for the tabs that have one
+    option = None
+    if tab == "Demands":
+        option = st.selectbox("Select Demand", tab_options(tab))
+    elif tab == "Violence":
+        option = st.selectbox("Select Violence Type", tab_options(tab))
+
+    view = trend_view(engine, entity_type, entity, year_range, tab, chart_type, option, file_prefix)
+    with stage('plotly_chart'):
+        st.plotly_chart(view['chart'])
+    # Add download button for the tab's data (the CSV is only serialized when clicked)
+    st.download_button(
+        label=view['label'],
+        data=view['csv'],
+        file_name=view['file_name'],
+        mime='text/csv',
+    )
+
 
 # Top navigation
-nav = st.radio("Navigation", ["Home", "World Trends", "Regional Trends", "Country Trends"], horizontal=True)
+nav = st.radio("Navigation", ["Home", "World Trends", "Regional Trends", "Country Trends", "Cross-Tab Analysis"], horizontal=True)
 
 # Home Page
 if nav == "Home":
@@ -70,26 +118,19 @@ elif nav == "World Trends":
         This section visualizes the global distribution and frequency of protests. 
         Select a year to see the number of protests in each country for that specific year.
     """)
-    year = st.selectbox("Select Year", sorted(df['year'].unique()))
-    
-    # Filter data for the selected year
-    filtered_data = df[df['year'] == year]
-    
-    # Count number of protests per country
-    protest_counts = filtered_data['country'].value_counts().reset_index()
-    protest_counts.columns = ['country', 'protests_count']
-    
-    # Create the map
-    world_map = px.scatter_geo(protest_counts, locations="country", locationmode='country names',
-                               color="protests_count", hover_name="country", size="protests_count",
-                               projection="natural earth", title="World Protests",
-                               color_continuous_scale=px.colors.sequential.Reds)
-    # Add borders and remove lakes
-    world_map.update_geos(showcoastlines=True, coastlinecolor="Black",
-                          showland=True, landcolor="white",
-                          showocean=True, oceancolor="LightBlue",
-                          showcountries=True, countrycolor="Black")
-    st.plotly_chart(world_map)
+    # Per-year counts are precomputed and built maps are cached, so switching years
+    # does not rebuild the figure
+    with stage('world_map'):
+        world_maps = get_world_map()
+    if st.checkbox("Animate all years"):
+        with stage('figure'):
+            world_map = world_maps.animated_figure()
+    else:
+        year = st.selectbox("Select Year", world_maps.years)
+        with stage('figure'):
+            world_map = world_maps.year_figure(year)
+    with stage('plotly_chart'):
+        st.plotly_chart(world_map)
 
 # Regional Trends Page
 elif nav == "Regional Trends":
@@ -101,117 +142,8 @@ elif nav == "Regional Trends":
     region = st.selectbox("Select Region", [r for r in df['region'].unique() if r != 'Canada'] + ['N.America(Canada)'])
     if region == 'N.America(Canada)':
         region = 'Canada'
-    
-    year_range = st.slider("Select Year Range", int(df['year'].min()), int(df['year'].max()), (int(df['year'].min()), 2020))
-
-    # Filter data for the selected region and year range
-    regional_data = df[(df['region'] == region) & (df['year'] >= year_range[0]) & (df['year'] <= year_range[1])]
-
-    # Tabs for data visualization
-    tab = st.selectbox("Select Tab", ["Protest Days", "Participants", "Demands", "Violence"])
-
-    # Chart type selection
-    chart_type = st.radio("Select Chart Type", ["Barplot", "Line Graph"])
-
-    # Friendly demand names mapping
-    demand_mapping = {
-        'demand_labor_wage_dispute': 'Labor/Wage Dispute',
-        'demand_land_farm_issue': 'Land/Farm Issue',
-        'demand_police_brutality': 'Police Brutality',
-        'demand_political_behavior': 'Political Behavior',
-        'demand_price_increases': 'Price Increases',
-        'demand_removal_of_politician': 'Removal of Politician'
-    }
-
-    if tab == "Protest Days":
-        protest_days = regional_data.groupby('year')['protest_duration'].sum().reset_index().sort_values(by='year')
-        if chart_type == "Barplot":
-            protest_days_chart = px.bar(protest_days, x="year", y="protest_duration", title="Cumulative Protest Days", labels={'protest_duration': 'Protest Days'})
-        else:
-            protest_days_chart = px.line(protest_days, x="year", y="protest_duration", title="Cumulative Protest Days", labels={'protest_duration': 'Protest Days'})
-        st.plotly_chart(protest_days_chart)
-        # Add download button for Protest Days data
-        csv = protest_days.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="Download Protest Days Data",
-            data=csv,
-            file_name='regional_protest_days.csv',
-            mime='text/csv',
-        )
-    elif tab == "Participants":
-        participants = regional_data.groupby('year')['participants_numeric'].sum().reset_index().sort_values(by='year')
-        if chart_type == "Barplot":
-            participants_chart = px.bar(participants, x="year", y="participants_numeric", title="Cumulative Number of Participants", labels={'participants_numeric': 'Participants'})
-        else:
-            participants_chart = px.line(participants, x="year", y="participants_numeric", title="Cumulative Number of Participants", labels={'participants_numeric': 'Participants'})
-        participants_chart.update_layout(yaxis=dict(tickformat='.2s', title='Participants'))
-        participants_chart.update_traces(hovertemplate='Year: %{x}<br>Participants: %{y:.0f}')
-        st.plotly_chart(participants_chart)
-        # Add download button for Participants data
-        csv = participants.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="Download Participants Data",
-            data=csv,
-            file_name='regional_participants.csv',
-            mime='text/csv',
-        )
-    elif tab == "Demands":
-        demand = st.selectbox("Select Demand", list(demand_mapping.values()))
-        demand_column = [key for key, value in demand_mapping.items() if value == demand][0]
-        demand_data = regional_data[regional_data[demand_column] == 1]
-        demand_counts = demand_data['year'].value_counts().reset_index().sort_values(by='year')
-        demand_counts.columns = ['year', 'protests_count']
-        if chart_type == "Barplot":
-            demand_chart = px.bar(demand_counts, x="year", y="protests_count", title=f"Protests with Demand: {demand}", labels={'protests_count': 'Protests Count'})
-        else:
-            demand_chart = px.line(demand_counts, x="year", y="protests_count", title=f"Protests with Demand: {demand}", labels={'protests_count': 'Protests Count'})
-        st.plotly_chart(demand_chart)
-        # Add download button for Demands data
-        csv = demand_counts.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label=f"Download Data for {demand}",
-            data=csv,
-            file_name=f'regional_{demand}.csv',
-            mime='text/csv',
-        )
-    elif tab == "Violence":
-        state_violence = ['response_beatings', 'response_shootings', 'response_killings']
-        violence_mapping = {
-            0: 'Non Violent',
-            1: 'Protester Violence',
-            2: 'State Violence',
-            3: 'Both Violence'
-        }
-        violence = st.selectbox("Select Violence Type", list(violence_mapping.values()))
-
-        if violence == 'Non Violent':
-            violence_data = regional_data[regional_data['protesterviolence'] == 0]
-            title = "Protests with Non-Violent Protesters"
-        elif violence == 'Protester Violence':
-            violence_data = regional_data[regional_data['protesterviolence'] == 1]
-            title = "Protests with Protester Violence"
-        elif violence == 'State Violence':
-            violence_data = regional_data[regional_data[state_violence].sum(axis=1) > 0]
-            title = "Protests with State Violence"
-        elif violence == 'Both Violence':
-            violence_data = regional_data[(regional_data['protesterviolence'] == 1) & (regional_data[state_violence].sum(axis=1) > 0)]
-            title = "Protests with Both State and Protester Violence"
-
-        violence_counts = violence_data.groupby('year').size().reset_index(name='protests_count').sort_values(by='year')
-        if chart_type == "Barplot":
-            violence_chart = px.bar(violence_counts, x="year", y="protests_count", title=title, labels={'protests_count': 'Protests Count'})
-        else:
-            violence_chart = px.line(violence_counts, x="year", y="protests_count", title=title, labels={'protests_count': 'Protests Count'})
-        st.plotly_chart(violence_chart)
-        # Add download button for Violence data
-        csv = violence_counts.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label=f"Download Data for {title}",
-            data=csv,
-            file_name=f'regional_{title.replace(" ", "_").lower()}.csv',
-            mime='text/csv',
-        )
 
+    render_trends('region', region, 'regional')
 
 # Country Trends Page
 elif nav == "Country Trends":
@@ -221,113 +153,43 @@ elif nav == "Country Trends":
         Select a country and a range of years to view the data on protest days, participants, demands, and violence.
     """)
     country = st.selectbox("Select Country", df['country'].unique())
-    
-    year_range = st.slider("Select Year Range", int(df['year'].min()), int(df['year'].max()), (int(df['year'].min()), 2020))
-    
-    # Filter data for the selected country and year range
-    country_data = df[(df['country'] == country) & (df['year'] >= year_range[0]) & (df['year'] <= year_range[1])]
 
-    # Tabs for data visualization
-    tab = st.selectbox("Select Tab", ["Protest Days", "Participants", "Demands", "Violence"])
+    render_trends('country', country, 'country')
 
-    # Chart type selection
-    chart_type = st.radio("Select Chart Type", ["Barplot", "Line Graph"])
-
-    # Friendly demand names mapping
-    demand_mapping = {
-        'demand_labor_wage_dispute': 'Labor/Wage Dispute',
-        'demand_land_farm_issue': 'Land/Farm Issue',
-        'demand_police_brutality': 'Police Brutality',
-        'demand_political_behavior': 'Political Behavior',
-        'demand_price_increases': 'Price Increases',
-        'demand_removal_of_politician': 'Removal of Politician'
-    }
-
-    if tab == "Protest Days":
-        protest_days = country_data.groupby('year')['protest_duration'].sum().reset_index().sort_values(by='year')
-        if chart_type == "Barplot":
-            protest_days_chart = px.bar(protest_days, x="year", y="protest_duration", title="Cumulative Protest Days", labels={'protest_duration': 'Protest Days'})
-        else:
-            protest_days_chart = px.line(protest_days, x="year", y="protest_duration", title="Cumulative Protest Days", labels={'protest_duration': 'Protest Days'})
-        st.plotly_chart(protest_days_chart)
-        # Add download button for Protest Days data
-        csv = protest_days.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="Download Protest Days Data",
-            data=csv,
-            file_name='country_protest_days.csv',
-            mime='text/csv',
-        )
-    elif tab == "Participants":
-        participants = country_data.groupby('year')['participants_numeric'].sum().reset_index().sort_values(by='year')
-        if chart_type == "Barplot":
-            participants_chart = px.bar(participants, x="year", y="participants_numeric", title="Cumulative Number of Participants", labels={'participants_numeric': 'Participants'})
-        else:
-            participants_chart = px.line(participants, x="year", y="participants_numeric", title="Cumulative Number of Participants", labels={'participants_numeric': 'Participants'})
-        participants_chart.update_layout(yaxis=dict(tickformat='.2s', title='Participants'))
-        participants_chart.update_traces(hovertemplate='Year: %{x}<br>Participants: %{y:.0f}')
-        st.plotly_chart(participants_chart)
-        # Add download button for Participants data
-        csv = participants.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="Download Participants Data",
-            data=csv,
-            file_name='country_participants.csv',
-            mime='text/csv',
-        )
-    elif tab == "Demands":
-        demand = st.selectbox("Select Demand", list(demand_mapping.values()))
-        demand_column = [key for key, value in demand_mapping.items() if value == demand][0]
-        demand_data = country_data[country_data[demand_column] == 1]
-        demand_counts = demand_data['year'].value_counts().reset_index().sort_values(by='year')
-        demand_counts.columns = ['year', 'protests_count']
-        if chart_type == "Barplot":
-            demand_chart = px.bar(demand_counts, x="year", y="protests_count", title=f"Protests with Demand: {demand}", labels={'protests_count': 'Protests Count'})
-        else:
-            demand_chart = px.line(demand_counts, x="year", y="protests_count", title=f"Protests with Demand: {demand}", labels={'protests_count': 'Protests Count'})
-        st.plotly_chart(demand_chart)
-        # Add download button for Demands data
-        csv = demand_counts.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label=f"Download Data for {demand}",
-            data=csv,
-            file_name=f'country_{demand}.csv',
-            mime='text/csv',
-        )
-    elif tab == "Violence":
-        state_violence = ['response_beatings', 'response_shootings', 'response_killings']
-        violence_mapping = {
-            0: 'Non Violent',
-            1: 'Protester Violence',
-            2: 'State Violence',
-            3: 'Both Violence'
-        }
-        violence = st.selectbox("Select Violence Type", list(violence_mapping.values()))
-
-        if violence == 'Non Violent':
-            violence_data = country_data[country_data['protesterviolence'] == 0]
-            title = "Protests with Non-Violent Protesters"
-        elif violence == 'Protester Violence':
-            violence_data = country_data[country_data['protesterviolence'] == 1]
-            title = "Protests with Protester Violence"
-        elif violence == 'State Violence':
-            violence_data = country_data[country_data[state_violence].sum(axis=1) > 0]
-            title = "Protests with State Violence"
-        elif violence == 'Both Violence':
-            violence_data = country_data[(country_data['protesterviolence'] == 1) & (country_data[state_violence].sum(axis=1) > 0)]
-            title = "Protests with Both State and Protester Violence"
-
-        violence_counts = violence_data.groupby('year').size().reset_index(name='protests_count').sort_values(by='year')
-        if chart_type == "Barplot":
-            violence_chart = px.bar(violence_counts, x="year", y="protests_count", title=title, labels={'protests_count': 'Protests Count'})
-        else:
-            violence_chart = px.line(violence_counts, x="year", y="protests_count", title=title, labels={'protests_count': 'Protests Count'})
-        st.plotly_chart(violence_chart)
-        # Add download button for Violence data
-        csv = violence_counts.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label=f"Download Data for {title}",
-            data=csv,
-            file_name=f'country_{title.replace(" ", "_").lower()}.csv',
-            mime='text/csv',
-        )
+# Cross-Tab Analysis Page
+elif nav == "Cross-Tab Analysis":
+    st.title("Cross-Tab Analysis")
+    st.write("""
+        This page cross-tabulates protester demands against state responses for a region or country.
+        Add filters to only count protests matching all of them, e.g. Police Brutality and State Violence.
+    """)
+    # Events sorted by region, country and year with bitmap indexes of the demand and
+    # response flags, built once per process
+    with stage('event_index'):
+        index = get_index()
+    level = st.radio("Level", ["Region", "Country"], horizontal=True)
+    if level == "Region":
+        entity = st.selectbox("Select Region", [r for r in df['region'].unique() if r != 'Canada'] + ['N.America(Canada)'])
+        if entity == 'N.America(Canada)':
+            entity = 'Canada'
+    else:
+        entity = st.selectbox("Select Country", df['country'].unique())
+    year_range = st.slider("Select Year Range", int(df['year'].min()), int(df['year'].max()), (int(df['year'].min()), 2020))
+    filters = st.multiselect("Filters (all must match)", list(FILTERS))
+
+    view = crosstab_view(index, level.lower(), entity, year_range, filters, level.lower())
+    st.metric("Matching Protests", f"{view['matches']:,}")
+    with stage('plotly_chart'):
+        st.plotly_chart(view['chart'])
+        st.plotly_chart(view['trend'])
+    st.download_button(
+        label=view['label'],
+        data=view['csv'],
+        file_name=view['file_name'],
+        mime='text/csv',
+    )
+
+# Stage breakdown of this run in the sidebar (?debug=timings or $METRICS_DEBUG)
+breakdown = finish_rerun()
+if debug_enabled(st.query_params):
+    show_breakdown(st.sidebar, breakdown)
@@ -0,0 +1,88 @@
+import threading
+from functools import lru_cache
+
+from aggregates import get_cube
+
+# Friendly demand names mapping
+DEMAND_MAPPING = {
+    'demand_labor_wage_dispute': 'Labor/Wage Dispute',
+    'demand_land_farm_issue': 'Land/Farm Issue',
+    'demand_police_brutality': 'Police Brutality',
+    'demand_political_behavior': 'Political Behavior',
+    'demand_price_increases': 'Price Increases',
+    'demand_removal_of_politician': 'Removal of Politician'
+}
+
+# Violence filters: cube measure and chart title
+VIOLENCE_FILTERS = {
+    'Non Violent': ('non_violent', "Protests with Non-Violent Protesters"),
+    'Protester Violence': ('protester_violence', "Protests with Protester Violence"),
+    'State Violence': ('state_violence', "Protests with State Violence"),
+    'Both Violence': ('both_violence', "Protests with Both State and Protester Violence")
+}
+
+# Query measures: value column of the result, and the cube measure when it needs no filter
+QUERY_MEASURES = {
+    'protest_days': ('protest_duration', 'protest_duration'),
+    'participants': ('participants_numeric', 'participants_numeric'),
+    'demands': ('protests_count', None),
+    'violence': ('protests_count', None),
+}
+
+# Number of distinct query results kept in memory
+CACHE_SIZE = 4096
+
+
+class QueryEngine:
+    """
+    Answers the dashboard's drill-down questions from the aggregate cube:
+
+        query(entity_type, entity, year_range, measure, filter=None)
+
+    `entity_type` is 'region' or 'country', `year_range` an inclusive (first, last)
+    tuple and `measure` one of QUERY_MEASURES. 'demands' takes a demand column as
+    filter and 'violence' a key of VIOLENCE_FILTERS. The result is a DataFrame with
+    'year' and the measure's value column. Results are memoized in an LRU cache keyed
+    by the query tuple and the cube version, so they must be treated as read-only.
+    """
+
+    def __init__(self, cube, cache_size=CACHE_SIZE):
+        self.cube = cube
+        self._cached_query = lru_cache(maxsize=cache_size)(self._run_query)
+
+    def cube_measure(self, measure, filter=None):
+        if measure not in QUERY_MEASURES:
+            raise ValueError(f"unknown measure: {measure}")
+        if measure == 'demands':
+            if filter not in DEMAND_MAPPING:
+                raise ValueError(f"unknown demand: {filter}")
+            return filter
+        if measure == 'violence':
+            if filter not in VIOLENCE_FILTERS:
+                raise ValueError(f"unknown violence type: {filter}")
+            return VIOLENCE_FILTERS[filter][0]
+        return QUERY_MEASURES[measure][1]
+
+    def query(self, entity_type, entity, year_range, measure, filter=None):
+        return self._cached_query(self.cube.version, entity_type, entity, tuple(year_range), measure, filter)
+
+    def _run_query(self, version, entity_type, entity, year_range, measure, filter):
+        value_name = QUERY_MEASURES.get(measure, (None,))[0]
+        return self.cube.frame(entity_type, entity, self.cube_measure(measure, filter), year_range, value_name)
+
+    def cache_info(self):
+        return self._cached_query.cache_info()
+
+
+# Process-wide engine, recreated together with the cube
+_lock = threading.Lock()
+_engine = None
+
+
+def get_engine():
+    global _engine
+    cube = get_cube()
+    with _lock:
+        if _engine is None or _engine.cube is not cube:
+            _engine = QueryEngine(cube)
+        return _engine
@@ -0,0 +1,108 @@
+import threading
+import weakref
+
+import plotly.express as px
+
+from chart_render import CsvDownload, ViewCache, chart_data
+from instrumentation import stage
+
+from query_engine import DEMAND_MAPPING, VIOLENCE_FILTERS
+
+TABS = ["Protest Days", "Participants", "Demands", "Violence"]
+
+CHART_TYPES = ["Barplot", "Line Graph"]
+
+# Query engine measure behind every tab
+TAB_MEASURES = {
+    "Protest Days": 'protest_days',
+    "Participants": 'participants',
+    "Demands": 'demands',
+    "Violence": 'violence',
+}
+
+# Demand columns by friendly name
+DEMAND_BY_NAME = {value: key for key, value in DEMAND_MAPPING.items()}
+
+# Rendered views of every query engine, dropped together with the engine
+_lock = threading.Lock()
+_view_caches = weakref.WeakKeyDictionary()
+
+
+def tab_options(tab):
+    """
+    Choices of the tab's second selectbox (demand or violence type), or None.
+    """
+    if tab == "Demands":
+        return list(DEMAND_MAPPING.values())
+    if tab == "Violence":
+        return list(VIOLENCE_FILTERS)
+    return None
+
+
+def tab_query(engine, entity_type, entity, year_range, tab, option=None):
+    """
+    The data shown by a tab, from the query engine.
+    """
+    if tab not in TAB_MEASURES:
+        raise ValueError(f"unknown tab: {tab}")
+    filter = DEMAND_BY_NAME[option] if tab == "Demands" else option
+    return engine.query(entity_type, entity, year_range, TAB_MEASURES[tab], filter)
+
+
+def _chart(data, chart_type, y, title, labels):
+    data = chart_data(data, "year", y)
+    if chart_type == "Barplot":
+        return px.bar(data, x="year", y=y, title=title, labels=labels)
+    return px.line(data, x="year", y=y, title=title, labels=labels)
+
+
+def view_cache(engine):
+    with _lock:
+        cache = _view_caches.get(engine)
+        if cache is None:
+            cache = _view_caches[engine] = ViewCache()
+        return cache
+
+
+def trend_view(engine, entity_type, entity, year_range, tab, chart_type, option=None, file_prefix=''):
+    """
+    Everything one Regional/Country tab shows: the queried data, its chart and the CSV
+    download (a callable building the bytes on first use, button label and file name).
+    `option` is the selected demand or violence type for the Demands and Violence tabs.
+    Views are cached per engine and cube version, so they must be treated as read-only.
+    """
+    key = (engine.cube.version, entity_type, entity, tuple(year_range), tab, chart_type, option, file_prefix)
+
+    def build():
+        with stage('query'):
+            data = tab_query(engine, entity_type, entity, year_range, tab, option)
+        with stage('figure'):
+            chart, label, file_name = _tab_chart(data, tab, chart_type, option, file_prefix)
+        return {
+            'data': data,
+            'chart': chart,
+            'csv': CsvDownload(data),
+            'label': label,
+            'file_name': file_name,
+        }
+
+    return view_cache(engine).get(key, build)
+
+
+def _tab_chart(data, tab, chart_type, option, file_prefix):
+    if tab == "Protest Days":
+        chart = _chart(data, chart_type, "protest_duration", "Cumulative Protest Days", {'protest_duration': 'Protest Days'})
+        label, file_name = "Download Protest Days Data", f'{file_prefix}_protest_days.csv'
+    elif tab == "Participants":
+        chart = _chart(data, chart_type, "participants_numeric", "Cumulative Number of Participants", {'participants_numeric': 'Participants'})
+        chart.update_layout(yaxis=dict(tickformat='.2s', title='Participants'))
+        chart.update_traces(hovertemplate='Year: %{x}<br>Participants: %{y:.0f}')
+        label, file_name = "Download Participants Data", f'{file_prefix}_participants.csv'
+    elif tab == "Demands":
+        chart = _chart(data, chart_type, "protests_count", f"Protests with Demand: {option}", {'protests_count': 'Protests Count'})
+        label, file_name = f"Download Data for {option}", f'{file_prefix}_{option}.csv'
+    else:
+        title = VIOLENCE_FILTERS[option][1]
+        chart = _chart(data, chart_type, "protests_count", title, {'protests_count': 'Protests Count'})
+        label, file_name = f"Download Data for {title}", f'{file_prefix}_{title.replace(" ", "_").lower()}.csv'
+    return chart, label, file_name
@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+
+import plotly.express as px
+
+from aggregates import get_cube
+
+# Number of per-year figures kept in memory
+FIGURE_CACHE_SIZE = 16
+
+
+def year_country_counts(cube):
+    """
+    Number of protests per country for every year, from the cube's country level.
+    Returns {year: DataFrame(country, protests_count)} sorted by descending count like
+    value_counts, plus the long frame of all years used for the animated map.
+    """
+    counts = cube.long_frame('country', 'protests').rename(columns={'protests': 'protests_count'})
+    counts = counts[counts['protests_count'] > 0]
+    counts = counts.sort_values(['year', 'protests_count'], ascending=[True, False], kind='stable').reset_index(drop=True)
+    per_year = {
+        int(year): part[['country', 'protests_count']].reset_index(drop=True)
+        for year, part in counts.groupby('year', sort=True)
+    }
+    return per_year, counts
+
+
+def style_map(world_map):
+    # Add borders and remove lakes
+    world_map.update_geos(showcoastlines=True, coastlinecolor="Black",
+                          showland=True, landcolor="white",
+                          showocean=True, oceancolor="LightBlue",
+                          showcountries=True, countrycolor="Black")
+    return world_map
+
+
+def build_year_figure(protest_counts):
+    world_map = px.scatter_geo(protest_counts, locations="country", locationmode='country names',
+                               color="protests_count", hover_name="country", size="protests_count",
+                               projection="natural earth", title="World Protests",
+                               color_continuous_scale=px.colors.sequential.Reds)
+    return style_map(world_map)
+
+
+def build_animated_figure(counts):
+    """
+    One scatter_geo with a frame per year and a year slider, built in a single pass.
+    The colour range is fixed across frames so years stay comparable.
+    """
+    world_map = px.scatter_geo(counts, locations="country", locationmode='country names',
+                               color="protests_count", hover_name="country", size="protests_count",
+                               animation_frame="year", projection="natural earth", title="World Protests",
+                               range_color=(0, int(counts['protests_count'].max())),
+                               color_continuous_scale=px.colors.sequential.Reds)
+    return style_map(world_map)
+
+
+class WorldMap:
+    """
+    Per-year country counts precomputed for all years, and an LRU cache of the built
+    figure objects so switching back to a year does not rebuild its map. st.plotly_chart
+    still serializes the cached figure on every rerun.
+    """
+
+    def __init__(self, cube, cache_size=FIGURE_CACHE_SIZE):
+        self.cube = cube
+        self.version = cube.version
+        self.cache_size = cache_size
+        self.counts, self.all_counts = year_country_counts(cube)
+        self.years = sorted(self.counts)
+        self._figures = OrderedDict()
+        self._animated = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def year_figure(self, year):
+        with self._lock:
+            figure = self._figures.get(year)
+            if figure is not None:
+                self._figures.move_to_end(year)
+                self.hits += 1
+                return figure
+        figure = build_year_figure(self.counts[year])
+        with self._lock:
+            self.misses += 1
+            self._figures[year] = figure
+            self._figures.move_to_end(year)
+            while len(self._figures) > self.cache_size:
+                self._figures.popitem(last=False)
+        return figure
+
+    def animated_figure(self):
+        if self._animated is None:
+            self._animated = build_animated_figure(self.all_counts)
+        return self._animated
+
+
+# Process-wide map cache, rebuilt when the cube changes or receives new events
+_lock = threading.Lock()
+_world_map = None
+
+
+def get_world_map():
+    global _world_map
+    cube = get_cube()
+    with _lock:
+        if _world_map is None or _world_map.cube is not cube or _world_map.version != cube.version:
+            _world_map = WorldMap(cube)
+        return _world_map